@@ -0,0 +1,118 @@
+"""Local stand-in for fortnite-api.com serving the benchmark fixtures.
+
+Run it on its own to point a real bot at it:
+
+    python -m bench.fake_api --size 200 --latency 0.05 --error-rate 0.1
+    FORTNITE_API_URL=http://127.0.0.1:8765/v2/shop python3 bot.py
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import random
+
+from aiohttp import web
+
+from bench.fixtures import load_fixture
+
+ERROR_MODES = ('status', 'timeout', 'malformed', 'empty')
+
+
+class FakeShopAPI:
+    """Serves /v2/shop from a fixture with configurable latency and failures.
+
+    Supports If-None-Match like the real API, and counts every request so
+    benchmarks can report how many upstream calls a code path made.
+    """
+
+    def __init__(self, payload, latency=0.0, error_rate=0.0, error_mode='status', seed=0):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.error_mode = error_mode
+        self.requests = 0
+        self.statuses = {}
+        self._rng = random.Random(seed)
+        self._runner = None
+        self.url = None
+        self.set_payload(payload)
+
+    def set_payload(self, payload):
+        """Serve a different shop from now on."""
+        self._body = json.dumps(payload).encode('utf-8')
+        self._etag = '"' + hashlib.sha1(self._body).hexdigest()[:16] + '"'
+
+    def reset_counts(self):
+        self.requests = 0
+        self.statuses = {}
+
+    def _count(self, status):
+        self.statuses[status] = self.statuses.get(status, 0) + 1
+
+    async def handle_shop(self, request):
+        self.requests += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+        if self.error_rate and self._rng.random() < self.error_rate:
+            if self.error_mode == 'timeout':
+                # Longer than the client's read timeout
+                await asyncio.sleep(3600)
+            if self.error_mode == 'malformed':
+                self._count(200)
+                return web.Response(body=b'{"status": 200, "data": {', content_type='application/json')
+            if self.error_mode == 'empty':
+                self._count(200)
+                return web.json_response({'status': 200, 'data': None})
+            self._count(503)
+            return web.Response(status=503, text='Service Unavailable')
+
+        if request.headers.get('If-None-Match') == self._etag:
+            self._count(304)
+            return web.Response(status=304, headers={'ETag': self._etag})
+
+        self._count(200)
+        return web.Response(body=self._body, content_type='application/json', headers={'ETag': self._etag})
+
+    async def start(self, host='127.0.0.1', port=0):
+        """Start serving; returns the /v2/shop URL."""
+        app = web.Application()
+        app.router.add_get('/v2/shop', self.handle_shop)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+        port = self._runner.addresses[0][1]
+        self.url = f'http://{host}:{port}/v2/shop'
+        return self.url
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+
+async def serve(args):
+    api = FakeShopAPI(load_fixture(args.size), args.latency, args.error_rate, args.error_mode)
+    url = await api.start(port=args.port)
+    print(f'Serving the {args.size}-entry fixture at {url}')
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await api.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Serve benchmark shop fixtures over HTTP.')
+    parser.add_argument('--size', type=int, default=200, help='fixture size (entries)')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency', type=float, default=0.0, help='seconds added to every response')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='fraction of requests that fail')
+    parser.add_argument('--error-mode', choices=ERROR_MODES, default='status')
+    try:
+        asyncio.run(serve(parser.parse_args()))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+"""Recorded-style /v2/shop payloads for the benchmarks.
+
+The fixtures are generated from a fixed seed, so every run (and every
+machine) benchmarks exactly the same shops. They are written to
+bench/fixtures/ the first time they are needed.
+"""
+import json
+import os
+import random
+from datetime import datetime, timedelta, timezone
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+SIZES = (50, 200, 1000)
+
+RARITIES = [
+    ('common', 'Common'), ('uncommon', 'Uncommon'), ('rare', 'Rare'),
+    ('epic', 'Epic'), ('legendary', 'Legendary'), ('mythic', 'Mythic'),
+]
+TYPES = [
+    ('outfit', 'Outfit'), ('backpack', 'Back Bling'), ('pickaxe', 'Harvesting Tool'),
+    ('glider', 'Glider'), ('emote', 'Emote'), ('wrap', 'Wrap'), ('music', 'Music'), ('banner', 'Banner'),
+]
+WORDS = [
+    'Shadow', 'Neon', 'Frost', 'Drift', 'Raven', 'Midas', 'Peely', 'Jonesy', 'Aura', 'Crystal',
+    'Galaxy', 'Renegade', 'Raider', 'Skull', 'Trooper', 'Lynx', 'Ember', 'Nova', 'Spark', 'Glitch',
+]
+PRICES = (200, 300, 500, 800, 1200, 1500, 2000, 2800)
+
+
+def make_item(rng, index):
+    rarity_value, rarity = rng.choice(RARITIES)
+    type_value, item_type = rng.choice(TYPES)
+    name = f'{rng.choice(WORDS)} {rng.choice(WORDS)} {index}'
+    item_id = f'{type_value}_{index:05d}'
+    return {
+        'id': item_id,
+        'name': name,
+        'description': f'A {rarity.lower()} {item_type.lower()} from the {rng.choice(WORDS)} set.',
+        'type': {'value': type_value, 'displayValue': item_type},
+        'rarity': {'value': rarity_value, 'displayValue': rarity},
+        'set': {'text': f'Part of the {rng.choice(WORDS)} set.'} if rng.random() < 0.6 else None,
+        'images': {
+            'icon': f'https://fortnite-api.com/images/cosmetics/br/{item_id}/icon.png',
+            'featured': f'https://fortnite-api.com/images/cosmetics/br/{item_id}/featured.png'
+            if rng.random() < 0.5 else None,
+        },
+    }
+
+
+def make_payload(size, seed=None, date='2024-01-01T00:00:00Z'):
+    """Build a /v2/shop response with size entries."""
+    rng = random.Random(size if seed is None else seed)
+    day = datetime.fromisoformat(date.replace('Z', '+00:00')).astimezone(timezone.utc)
+    entries = []
+    for index in range(size):
+        items = [make_item(rng, index * 4 + n) for n in range(rng.choice((1, 1, 1, 2, 3)))]
+        regular_price = rng.choice(PRICES)
+        final_price = regular_price - rng.choice((100, 200, 300)) if rng.random() < 0.15 else regular_price
+        bundle = {'name': f'{rng.choice(WORDS)} Bundle'} if len(items) > 1 else None
+        out_date = day + timedelta(days=rng.choice((1, 1, 2, 3)))
+        entries.append({
+            'regularPrice': regular_price,
+            'finalPrice': max(final_price, 100),
+            'offerId': f'v2:/offer-{size}-{index:05d}',
+            'bundle': bundle,
+            'outDate': out_date.strftime('%Y-%m-%dT%H:%M:%SZ'),
+            'brItems': items,
+        })
+    return {'status': 200, 'data': {'hash': f'fixture-{size}', 'date': date, 'entries': entries}}
+
+
+def fixture_path(size):
+    return os.path.join(FIXTURE_DIR, f'shop_{size}.json')
+
+
+def load_fixture(size):
+    """Return the fixture payload for size, writing it to disk on first use."""
+    path = fixture_path(size)
+    if not os.path.exists(path):
+        os.makedirs(FIXTURE_DIR, exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(make_payload(size), f)
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+if __name__ == '__main__':
+    for size in SIZES:
+        load_fixture(size)
+        print(f'Wrote {fixture_path(size)}')
@@ -0,0 +1,112 @@
+"""Minimal stand-ins for the discord.py objects the command handlers touch."""
+import itertools
+
+_ids = itertools.count(1)
+
+
+class FakeMessage:
+    def __init__(self, kwargs):
+        self.id = next(_ids)
+        self.kwargs = kwargs
+        self.jump_url = f'https://discord.com/channels/1/1/{self.id}'
+
+    async def edit(self, **kwargs):
+        self.kwargs.update(kwargs)
+
+
+class FakeResponse:
+    def __init__(self, interaction):
+        self._interaction = interaction
+        self._done = False
+
+    def is_done(self):
+        return self._done
+
+    async def defer(self, **kwargs):
+        self._done = True
+
+    async def send_message(self, content=None, **kwargs):
+        self._done = True
+        self._interaction.sent.append(dict(kwargs, content=content))
+
+    async def edit_message(self, **kwargs):
+        self._done = True
+        self._interaction.sent.append(kwargs)
+
+    async def send_modal(self, modal):
+        self._done = True
+
+
+class FakeFollowup:
+    def __init__(self, interaction):
+        self._interaction = interaction
+
+    async def send(self, content=None, wait=False, **kwargs):
+        kwargs['content'] = content
+        self._interaction.sent.append(kwargs)
+        return FakeMessage(kwargs)
+
+
+class FakePermissions:
+    def __init__(self, administrator):
+        self.administrator = administrator
+
+
+class FakeUser:
+    def __init__(self, user_id, administrator=False):
+        self.id = user_id
+        self.guild_permissions = FakePermissions(administrator)
+        self.dms = []
+
+    async def send(self, **kwargs):
+        self.dms.append(kwargs)
+
+
+class FakeInteraction:
+    """Records everything a command sends instead of talking to Discord."""
+
+    def __init__(self, user_id=1, guild_id=1, channel_id=1, administrator=False):
+        self.user = FakeUser(user_id, administrator)
+        self.guild_id = guild_id
+        self.channel_id = channel_id
+        self.sent = []
+        self.response = FakeResponse(self)
+        self.followup = FakeFollowup(self)
+
+
+class FakeChannel:
+    def __init__(self, channel_id):
+        self.id = channel_id
+        self.mention = f'<#{channel_id}>'
+        self.messages = 0
+
+    async def send(self, **kwargs):
+        self.messages += 1
+        return FakeMessage(kwargs)
+
+
+class FakeClient:
+    """Resolves any channel or user ID, as if the bot could see everything."""
+
+    def __init__(self):
+        self.channels = {}
+        self.users = {}
+
+    def get_channel(self, channel_id):
+        channel = self.channels.get(channel_id)
+        if channel is None:
+            channel = self.channels[channel_id] = FakeChannel(channel_id)
+        return channel
+
+    def get_user(self, user_id):
+        user = self.users.get(user_id)
+        if user is None:
+            user = self.users[user_id] = FakeUser(user_id)
+        return user
+
+    async def fetch_user(self, user_id):
+        return self.get_user(user_id)
+
+    @property
+    def messages_sent(self):
+        return sum(channel.messages for channel in self.channels.values())
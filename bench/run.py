@@ -0,0 +1,280 @@
+"""Benchmark the bot's hot paths against local fixtures.
+
+    python -m bench.run                      # all fixture sizes
+    python -m bench.run --sizes 200 --iterations 500
+    python -m bench.run --json results.json  # save results
+    python -m bench.run --baseline results.json  # fail on p50 regressions
+
+Command handlers run against mocked interactions, and check_shop_update
+runs against bench.fake_api, so nothing talks to Discord or the real API.
+Every benchmark reports latency percentiles, the peak memory allocated
+by one call and the upstream requests made per call.
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+import types
+
+from bench.fake_api import FakeShopAPI
+from bench.fixtures import SIZES, load_fixture, make_payload
+from bench.mock_discord import FakeClient, FakeInteraction
+
+# Channels the update is broadcast to in the check_shop_update benchmarks
+CHANNELS = 100
+# Watch subscriptions loaded for the check_shop_update benchmarks
+WATCHES = 10000
+
+
+def configure_environment(workdir):
+    """Point all on-disk state at a scratch directory before the bot is imported."""
+    os.environ['SHOP_DB_PATH'] = os.path.join(workdir, 'shopbot.db')
+    os.environ['SHOP_ARCHIVE_DIR'] = os.path.join(workdir, 'archive')
+    os.environ['IMAGE_CACHE_DIR'] = os.path.join(workdir, 'images')
+    os.environ['SHOP_IMAGE_DIR'] = os.path.join(workdir, 'shop_images')
+    # Measure the bot's own work, not the pacing that protects Discord's limits
+    os.environ['BROADCAST_RATE'] = '1000000'
+
+
+def import_bot():
+    # The token is never used: the benchmarks do not log in
+    try:
+        import config  # noqa: F401
+    except ImportError:
+        config = types.ModuleType('config')
+        config.TOKEN = None
+        sys.modules['config'] = config
+    import bot
+    return bot
+
+
+class Result:
+    __slots__ = ('name', 'size', 'timings', 'alloc_bytes', 'requests')
+
+    def __init__(self, name, size, timings, alloc_bytes, requests):
+        self.name = name
+        self.size = size
+        self.timings = timings
+        self.alloc_bytes = alloc_bytes
+        self.requests = requests
+
+    def percentiles(self):
+        """Return p50, p95, p99 and max in milliseconds."""
+        timings = sorted(self.timings)
+        cuts = statistics.quantiles(timings, n=100, method='inclusive') if len(timings) > 1 else timings * 99
+        return cuts[49] * 1000, cuts[94] * 1000, cuts[98] * 1000, timings[-1] * 1000
+
+    def to_record(self):
+        p50, p95, p99, worst = self.percentiles()
+        return {
+            'name': self.name, 'size': self.size, 'iterations': len(self.timings),
+            'p50_ms': p50, 'p95_ms': p95, 'p99_ms': p99, 'max_ms': worst,
+            'alloc_kib': self.alloc_bytes / 1024, 'requests_per_call': self.requests,
+        }
+
+
+async def measure(name, size, func, iterations, setup=None, api=None, alloc_runs=10, warmup=3):
+    """Time func() (a coroutine function) and record its peak allocation."""
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(warmup):
+            if setup:
+                setup()
+            await func()
+
+        if api is not None:
+            api.reset_counts()
+        timings = []
+        for _ in range(iterations):
+            if setup:
+                setup()
+            started = time.perf_counter()
+            await func()
+            timings.append(time.perf_counter() - started)
+        requests = api.requests / iterations if api is not None else 0.0
+
+        peaks = []
+        tracemalloc.start()
+        for _ in range(alloc_runs):
+            if setup:
+                setup()
+            tracemalloc.reset_peak()
+            before = tracemalloc.get_traced_memory()[0]
+            await func()
+            peaks.append(tracemalloc.get_traced_memory()[1] - before)
+        tracemalloc.stop()
+
+    return Result(name, size, timings, statistics.median(peaks), requests)
+
+
+def call(func, *args):
+    """Wrap a plain function so measure() can await it."""
+    async def run():
+        func(*args)
+    return run
+
+
+def command(handler, *args, **kwargs):
+    """Run a slash command callback against a fresh mocked interaction."""
+    async def run():
+        await handler.callback(FakeInteraction(), *args, **kwargs)
+    return run
+
+
+async def bench_size(bot, api, size, iterations):
+    import shop_api
+    from shop_model import ShopSnapshot
+
+    payload = load_fixture(size)
+    snapshot = ShopSnapshot.from_payload(payload)
+    sample = snapshot.entries[len(snapshot.entries) // 2]
+    query = sample.item.name.split()[0]
+    results = []
+
+    async def run(name, func, **kwargs):
+        results.append(await measure(name, size, func, iterations, **kwargs))
+
+    # Parsing and rendering, without any caches
+    await run('parse payload', call(ShopSnapshot.from_payload, payload))
+    await run('format_shop_messages', call(bot.format_shop_messages, snapshot))
+    await run('build_shop_page', call(bot.build_shop_page, snapshot, None, None, 0))
+    await run('build_shop_page (filtered)', call(bot.build_shop_page, snapshot, 'epic', 'outfit', 0))
+    await run('build_rarity_message', call(bot.build_rarity_message, snapshot, 'epic'))
+    await run('build_type_message', call(bot.build_type_message, snapshot, 'outfit'))
+    await run('build_expensive_message', call(bot.build_expensive_message, snapshot, 'epic', 'outfit'))
+    await run('build_cheap_message', call(bot.build_cheap_message, snapshot))
+    await run('build_deals_message', call(bot.build_deals_message, snapshot))
+    await run('build_search_message', call(bot.build_search_message, snapshot, query))
+
+    # Command handlers against the cached snapshot, with a cold and a warm render cache
+    bot.shop_cache.store(snapshot)
+    handlers = [
+        ('/shop', bot.shop, ()),
+        ('/item', bot.item, (sample.item.name,)),
+        ('/search', bot.search, (query,)),
+        ('/price', bot.price, (sample.item.name,)),
+        ('/deals', bot.deals, ()),
+        ('/stats', bot.stats, ()),
+        ('/rarity', bot.rarity, ('epic',)),
+        ('/type', bot.type_filter, ('outfit',)),
+        ('/expensive', bot.expensive, ('epic', 'outfit')),
+        ('/cheap', bot.cheap, ()),
+        ('/bundles', bot.bundles, ()),
+    ]
+    for name, handler, args in handlers:
+        await run(f'{name} (cold)', command(handler, *args), setup=bot.render_cache.clear)
+        await run(f'{name} (warm)', command(handler, *args))
+
+    # check_shop_update against the fake API
+    other = make_payload(size, seed=size + 1, date='2024-01-02T00:00:00Z')
+    payloads = [payload, other]
+
+    def rotate():
+        payloads.reverse()
+        api.set_payload(payloads[0])
+
+    api.set_payload(payload)
+    await run('check_shop_update (unchanged)', bot.check_shop_update, api=api)
+    await run('check_shop_update (new shop)', bot.check_shop_update, setup=rotate, api=api)
+    api.error_rate = 1.0
+    await run('check_shop_update (API down)', bot.check_shop_update, api=api)
+    api.error_rate = 0.0
+    # Let the next fixture size start with closed circuit breakers
+    shop_api.breakers.clear()
+    return results
+
+
+def print_results(results, regressions=()):
+    header = f'{"benchmark":<32} {"size":>5} {"p50 ms":>9} {"p95 ms":>9} {"p99 ms":>9} {"max ms":>9} {"alloc KiB":>10} {"req/call":>8}'
+    print(header)
+    print('-' * len(header))
+    for result in results:
+        p50, p95, p99, worst = result.percentiles()
+        flag = '  << regression' if (result.name, result.size) in regressions else ''
+        print(f'{result.name:<32} {result.size:>5} {p50:>9.3f} {p95:>9.3f} {p99:>9.3f} {worst:>9.3f} '
+              f'{result.alloc_bytes / 1024:>10.1f} {result.requests:>8.2f}{flag}')
+
+
+def find_regressions(results, baseline_path, threshold):
+    with open(baseline_path, encoding='utf-8') as f:
+        baseline = {(record['name'], record['size']): record for record in json.load(f)}
+    regressions = set()
+    for result in results:
+        previous = baseline.get((result.name, result.size))
+        if previous and result.percentiles()[0] > previous['p50_ms'] * (1 + threshold):
+            regressions.add((result.name, result.size))
+    return regressions
+
+
+async def run_benchmarks(args):
+    from logs import setup_logging
+
+    bot = import_bot()
+    import shop_api
+    import shop_images
+
+    if not args.images:
+        # Rendering images would download every icon from the real CDN
+        shop_images.Image = None
+
+    api = FakeShopAPI(load_fixture(args.sizes[0]), latency=args.latency)
+    shop_api.FORTNITE_API_URL = await api.start()
+
+    bot.broadcaster.client = FakeClient()
+    bot.channel_registry.load((guild_id, guild_id) for guild_id in range(1, args.channels + 1))
+    bot.watch_list.load((user_id, f'outfit_{user_id % 4000:05d}', 'Watched item') for user_id in range(args.watches))
+
+    # Log through the real pipeline, into the void
+    devnull = open(os.devnull, 'w')
+    log_listener = setup_logging(stream=devnull)
+
+    results = []
+    try:
+        for size in args.sizes:
+            results.extend(await bench_size(bot, api, size, args.iterations))
+    finally:
+        await api.stop()
+        await shop_api.close_session()
+        await bot.shop_store.close()
+        bot.shop_archive.close()
+        log_listener.stop()
+        devnull.close()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the shop bot hot paths.')
+    parser.add_argument('--sizes', type=int, nargs='+', default=list(SIZES), help='fixture sizes to run')
+    parser.add_argument('--iterations', type=int, default=200)
+    parser.add_argument('--latency', type=float, default=0.0, help='fake API latency in seconds')
+    parser.add_argument('--channels', type=int, default=CHANNELS, help='channels each update is broadcast to')
+    parser.add_argument('--watches', type=int, default=WATCHES, help='watch subscriptions to match')
+    parser.add_argument('--images', action='store_true', help='also render shop images (needs Pillow and network)')
+    parser.add_argument('--json', help='write the results to this file')
+    parser.add_argument('--baseline', help='compare against a --json file from an earlier run')
+    parser.add_argument('--threshold', type=float, default=0.2, help='p50 slowdown counted as a regression')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix='shopbot-bench-') as workdir:
+        configure_environment(workdir)
+        results = asyncio.run(run_benchmarks(args))
+
+    regressions = find_regressions(results, args.baseline, args.threshold) if args.baseline else set()
+    print_results(results, regressions)
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump([result.to_record() for result in results], f, indent=2)
+    if regressions:
+        print(f'\n{len(regressions)} benchmark(s) regressed by more than {args.threshold:.0%}')
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
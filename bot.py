@@ -1,100 +1,278 @@
 import discord
-from discord.ext import commands, tasks
-import requests
+from discord import app_commands
+from discord.ext import commands
+import logging
+import math
 import os
-import json
+import time
 
 # Import bot token from config
 from config import TOKEN
+from shop_api import NOT_MODIFIED, endpoint_name, endpoints, fetch_shop, fetch_stats, close_session, get_breaker
+from shop_cache import ShopCache
+from render_cache import RenderCache
+from scheduler import RotationScheduler
+from broadcast import Broadcaster, ChannelRegistry, attachment_rejected, message_kwargs
+from storage import ShopStore
+from embed_packing import group_embeds, pack_fields
+from shop_view import ShopPaginator
+from shop_archive import ShopArchive
+from watchlist import AlertQueue, WatchList
+from shop_images import IMAGE_RENDER_WAIT, SHOP_IMAGE_DIR, ShopImageRenderer, attachment_groups
+from image_cache import IMAGE_CACHE_DIR, ImageCache
+from logs import bind, setup_logging
+from command_limits import CommandLimiter, InFlightReplies
+from cluster import SHARDED, Cluster, bot_options, process_path, shard_scope
+from metrics import MetricsServer, command_errors, command_seconds, registry, update_seconds, watch_discord_rate_limits
+
+
+log = logging.getLogger('shopbot')
+command_log = logging.getLogger('shopbot.commands')
+
+
+class ShopCommandTree(app_commands.CommandTree):
+    async def interaction_check(self, interaction: discord.Interaction):
+        # Every log record from this command carries the interaction's context
+        bind(
+            correlation_id=f'{interaction.id:x}',
+            command=interaction.command.qualified_name if interaction.command else None,
+            guild_id=interaction.guild_id,
+            user_id=interaction.user.id
+        )
+        if interaction.type is not discord.InteractionType.application_command or interaction.command is None:
+            return True
+        name = interaction.command.qualified_name
+        retry_after = command_limiter.check(name, interaction.user.id, interaction.guild_id)
+        if retry_after:
+            command_log.info('Command rate limited', extra={'retry_after': round(retry_after, 1)})
+            await interaction.response.send_message(
+                f'⏳ Slow down! You can use /{name} again in {math.ceil(retry_after)}s.', ephemeral=True)
+            return False
+        return True
+
+
+class ShopBot(commands.AutoShardedBot if SHARDED else commands.Bot):
+    async def setup_hook(self):
+        await metrics_server.start()
+        watch_discord_rate_limits()
+        
+        # Warm the caches from disk before the first shop request
+        global last_shop_fingerprint
+        channels, last_shop_fingerprint, snapshot = await shop_store.load()
+        channel_registry.load(channels)
+        if snapshot:
+            shop_cache.store(snapshot, stale=True)
+            # Items already in the stored shop were alerted before the restart
+            watch_list.seen(snapshot)
+        watches_version = await shop_store.watches_version()
+        watch_list.load(await shop_store.load_watches())
+        watch_list.version = watches_version
+        log.info('Loaded %d shop channel(s) and %d watch(es) from %s', len(channels), len(watch_list), shop_store.path)
+        rotations = await shop_archive.load()
+        log.info('Loaded %d archived shop rotation(s) from %s', rotations, shop_archive.directory)
+
+    async def close(self):
+        # Release the pooled HTTP session before the gateway shuts down
+        shop_scheduler.stop()
+        cluster.stop()
+        alert_queue.stop()
+        shop_images.close()
+        image_cache.close()
+        await metrics_server.stop()
+        await close_session()
+        await shop_store.close()
+        shop_archive.close()
+        await super().close()
+
 
 # Bot setup
 intents = discord.Intents.default()
 intents.message_content = True
-bot = commands.Bot(command_prefix='!', intents=intents, activity=discord.Activity(type=discord.ActivityType.watching, name="Fortnite Item Shop"))
+bot = ShopBot(command_prefix='!', intents=intents, tree_cls=ShopCommandTree, activity=discord.Activity(type=discord.ActivityType.watching, name="Fortnite Item Shop"), **bot_options())
 
 
 
 # Global variables
-shop_channel_id = None  # Will be set by admin command
-last_shop_data = None
+shop_store = ShopStore(scope=shard_scope())  # Guild settings and the last shop, kept across restarts
+channel_registry = ChannelRegistry(shop_store)  # Guild -> update channel, set by admin command
+last_shop_fingerprint = None
+
+# Every shop rotation seen, for /history and /lastseen
+shop_archive = ShopArchive()
+
+async def fetch_shop_for_role(conditional=False):
+    """Fetch the shop, unless another process polls it and shares its snapshots."""
+    if conditional and not cluster.is_leader:
+        return NOT_MODIFIED
+    return await fetch_shop(conditional)
+
+# Shared shop snapshot used by every command
+shop_cache = ShopCache(fetch_shop_for_role)
+
+# Rendered command replies for the current snapshot
+render_cache = RenderCache()
+
+# Per-user and per-guild command budgets, checked before any command runs
+command_limiter = CommandLimiter()
 
-# Fortnite API URL - using a more reliable endpoint
-FORTNITE_API_URL = 'https://fortnite-api.com/v2/shop'
+# /shop replies still being sent, per channel
+shop_replies = InFlightReplies()
+
+# Sends shop updates to every registered channel
+broadcaster = Broadcaster(bot, channel_registry)
+
+# Item alerts: user subscriptions and the DM queue that delivers them
+watch_list = WatchList(shop_store)
+alert_queue = AlertQueue(bot)
+
+# Prometheus /metrics endpoint and event loop lag probe
+metrics_server = MetricsServer()
 
 @bot.event
 async def on_ready():
-    print(f'Logged in as {bot.user}')
-    print('Bot is now watching the Fortnite Item Shop! 🛒')
-    check_shop_update.start()
+    log.info('Logged in as %s', bot.user)
+    log.info('Bot is now watching the Fortnite Item Shop! 🛒')
+    # Polling starts here, or once this process is elected to poll for all shards
+    await cluster.start()
     
     # Sync slash commands
     try:
         synced = await bot.tree.sync()
-        print(f"Synced {len(synced)} command(s)")
-    except Exception as e:
-        print(f"Failed to sync commands: {e}")
+        log.info('Synced %d command(s)', len(synced))
+    except Exception:
+        log.exception('Failed to sync commands')
+
+@bot.event
+async def on_app_command_completion(interaction: discord.Interaction, command):
+    # Measured from when Discord created the interaction, so it includes gateway delay
+    latency = (discord.utils.utcnow() - interaction.created_at).total_seconds()
+    command_seconds.observe(latency, command.qualified_name)
+    command_log.info('Command completed', extra={'latency_ms': round(latency * 1000, 1)})
+
+@bot.tree.error
+async def on_app_command_error(interaction: discord.Interaction, error: app_commands.AppCommandError):
+    name = interaction.command.qualified_name if interaction.command else 'unknown'
+    command_errors.inc(name)
+    log.error('Error in %s command', name, exc_info=error)
 
 @bot.tree.command(name="shop", description="Show the current Fortnite item shop")
 async def shop(interaction: discord.Interaction):
     """Show the current Fortnite item shop."""
+    # Another /shop in this channel is still being answered: point at that one
+    pending = shop_replies.pending(interaction.channel_id)
+    if pending is not None:
+        await interaction.response.defer(ephemeral=True)
+        message = await pending
+        if message is not None:
+            await interaction.followup.send(f'The shop is right here: {message.jump_url}', ephemeral=True)
+        else:
+            await interaction.followup.send('Could not fetch the item shop.', ephemeral=True)
+        return
+    
+    async with shop_replies.answer(interaction.channel_id) as reply:
+        reply.set(await send_shop(interaction))
+
+async def send_shop(interaction):
+    """Answer /shop; returns the message sent, or None if the shop is unavailable."""
     await interaction.response.defer()
     
-    shop_data = fetch_shop()
-    if shop_data:
-        embeds = format_shop_embed(shop_data)
+    snapshot = await shop_cache.get()
+    if snapshot:
+        # Pages of this view's shop once a newer one is being served
+        old_pages = {}
         
-        # Send first embed
-        await interaction.followup.send(embed=embeds[0])
+        def render_page(rarity, item_type, page):
+            current = shop_cache.peek()
+            if current is not None and current.content_hash != snapshot.content_hash:
+                # Rendering an old shop through the shared cache would clear it for the new one
+                key = (rarity, item_type, page)
+                if key not in old_pages:
+                    old_pages[key] = build_shop_page(snapshot, *key)
+                return old_pages[key]
+            return render_cache.get(snapshot, 'shop_page', (rarity, item_type, page), build_shop_page)
         
-        # Send additional embeds if there are more
-        for embed in embeds[1:]:
-            await interaction.followup.send(embed=embed)
-    else:
-        await interaction.followup.send('Could not fetch the item shop.')
+        rarities = [(value, entries[0].item.rarity) for value, entries in snapshot.by_rarity.items() if value]
+        types = [(value, entries[0].item.type) for value, entries in snapshot.by_type.items() if value]
+        
+        # One message; further pages are only rendered when someone asks for them
+        view = ShopPaginator(render_page, rarities, types, interaction.user.id)
+        embed = view.render(0)
+        
+        view.message = await interaction.followup.send(embed=embed, view=view, wait=True)
+        
+        # The shop grid images follow in their own messages if this rotation has been rendered
+        image_paths = shop_images.peek(snapshot)
+        if image_paths is None:
+            shop_images.prefetch(snapshot)
+        else:
+            await send_shop_images(interaction, image_paths)
+        return view.message
+    await interaction.followup.send('Could not fetch the item shop.')
+    return None
+
+async def send_shop_images(interaction, image_paths):
+    for group in attachment_groups(image_paths):
+        try:
+            await interaction.followup.send(**message_kwargs({'file_paths': group}))
+        except discord.HTTPException as e:
+            if not attachment_rejected(e):
+                raise
+            # The shop itself has been sent; only the images are missing
+            log.warning('Shop images too large to send: %s', e)
+            return
 
 @bot.tree.command(name="item", description="Show detailed information about a specific item")
 async def item(interaction: discord.Interaction, item_name: str):
     """Show detailed information about a specific item."""
     await interaction.response.defer()
     
-    shop_data = fetch_shop()
-    if not shop_data:
+    snapshot = await shop_cache.get()
+    if not snapshot:
         await interaction.followup.send('Could not fetch the item shop.')
         return
     
     try:
-        if 'data' in shop_data and shop_data['data']:
-            entries = shop_data['data'].get('entries', [])
-            
-            for entry in entries:
-                if entry.get('brItems') and entry['brItems']:
-                    item = entry['brItems'][0]
-                    if item.get('name', '').lower() == item_name.lower():
-                        embed = create_item_detail_embed(item, entry)
-                        await interaction.followup.send(embed=embed)
-                        return
-            
-            await interaction.followup.send(f'Item "{item_name}" not found in the current shop.')
-        else:
-            await interaction.followup.send('No shop data available.')
+        message = render_cache.get(snapshot, 'item', (item_name,), build_item_message)
+        await interaction.followup.send(**message)
             
-    except Exception as e:
-        print(f'Error in item command: {e}')
+    except Exception:
+        log.exception('Error in item command')
         await interaction.followup.send('Error fetching item details.')
 
-def create_item_detail_embed(item, entry):
+async def item_name_autocomplete(interaction: discord.Interaction, current: str):
+    """Suggest item names from the cached shop for /item and /price."""
+    # Autocomplete must answer within 3 seconds, so never wait on the API here
+    snapshot = shop_cache.peek()
+    if not snapshot:
+        shop_cache.prefetch()
+        return []
+    return [
+        app_commands.Choice(name=name[:100], value=name[:100])
+        for name in snapshot.search_index.complete(current, limit=25)
+    ]
+
+item.autocomplete('item_name')(item_name_autocomplete)
+
+def build_item_message(snapshot, item_name):
+    """Build the /item reply for an item name."""
+    entry = snapshot.find(item_name)
+    if entry:
+        return {'embed': create_item_detail_embed(entry)}
+    return {'content': f'Item "{item_name}" not found in the current shop.'}
+
+def create_item_detail_embed(entry):
     """Create a detailed embed for a specific item."""
-    name = item.get('name', 'Unknown Item')
-    description = item.get('description', 'No description available.')
-    price = entry.get('finalPrice', 0)
-    rarity = item.get('rarity', {}).get('displayValue', 'Common')
-    item_type = item.get('type', {}).get('displayValue', 'Item')
-    set_info = item.get('set', {}).get('text', '')
+    item = entry.item
+    name = item.name
+    description = item.description
+    price = entry.final_price
+    rarity = item.rarity
+    item_type = item.type
+    set_info = item.set_text
     
     # Get images
-    images = item.get('images', {})
-    icon_url = images.get('icon', '')
-    featured_url = images.get('featured', '')
+    icon_url = item.icon_url
+    featured_url = item.featured_url
     
     # Create embed
     embed = discord.Embed(
@@ -118,8 +296,8 @@ def create_item_detail_embed(item, entry):
         embed.set_thumbnail(url=icon_url)
     
     # Add bundle info if available
-    if entry.get('bundle'):
-        embed.add_field(name="📦 Bundle", value=entry['bundle']['name'], inline=False)
+    if entry.bundle_name:
+        embed.add_field(name="📦 Bundle", value=entry.bundle_name, inline=False)
     
     return embed
 
@@ -143,8 +321,7 @@ async def setshopchannel(interaction: discord.Interaction, channel: discord.Text
         await interaction.response.send_message("You need administrator permissions to use this command.", ephemeral=True)
         return
     
-    global shop_channel_id
-    shop_channel_id = channel.id
+    channel_registry.set(interaction.guild_id, channel.id)
     await interaction.response.send_message(f'Item shop updates will be sent to {channel.mention}')
 
 @bot.tree.command(name="search", description="Search for items in the current shop")
@@ -152,224 +329,186 @@ async def search(interaction: discord.Interaction, query: str):
     """Search for items in the current shop."""
     await interaction.response.defer()
     
-    shop_data = fetch_shop()
-    if not shop_data:
+    snapshot = await shop_cache.get()
+    if not snapshot:
         await interaction.followup.send('Could not fetch the item shop.')
         return
     
     try:
-        if 'data' in shop_data and shop_data['data']:
-            entries = shop_data['data'].get('entries', [])
-            found_items = []
-            
-            for entry in entries:
-                if entry.get('brItems') and entry['brItems']:
-                    item = entry['brItems'][0]
-                    name = item.get('name', '').lower()
-                    description = item.get('description', '').lower()
-                    
-                    if query.lower() in name or query.lower() in description:
-                        found_items.append((item, entry))
-            
-            if found_items:
-                embed = discord.Embed(
-                    title=f'🔍 Search Results for "{query}"',
-                    color=0x4A90E2
-                )
-                
-                for i, (item, entry) in enumerate(found_items[:5]):  # Show up to 5 results
-                    name = item.get('name', 'Unknown Item')
-                    price = entry.get('finalPrice', 0)
-                    rarity = item.get('rarity', {}).get('displayValue', 'Common')
-                    
-                    embed.add_field(
-                        name=f"{i+1}. {name}",
-                        value=f"💰 {price} V-Bucks | ⭐ {rarity}",
-                        inline=False
-                    )
-                
-                await interaction.followup.send(embed=embed)
-            else:
-                await interaction.followup.send(f'No items found matching "{query}".')
-        else:
-            await interaction.followup.send('No shop data available.')
+        message = render_cache.get(snapshot, 'search', (query,), build_search_message)
+        await interaction.followup.send(**message)
             
-    except Exception as e:
-        print(f'Error in search command: {e}')
+    except Exception:
+        log.exception('Error in search command')
         await interaction.followup.send('Error searching for items.')
 
+def build_search_message(snapshot, query):
+    """Build the /search reply for a query."""
+    found_items = snapshot.search_index.search(query, limit=5)
+    
+    if found_items:
+        embed = discord.Embed(
+            title=f'🔍 Search Results for "{query}"',
+            color=0x4A90E2
+        )
+        
+        for i, entry in enumerate(found_items):  # Show up to 5 results
+            embed.add_field(
+                name=f"{i+1}. {entry.item.name}",
+                value=f"💰 {entry.final_price} V-Bucks | ⭐ {entry.item.rarity}",
+                inline=False
+            )
+        
+        return {'embed': embed}
+    else:
+        return {'content': f'No items found matching "{query}".'}
+
 @bot.tree.command(name="price", description="Check the price of a specific item")
 async def price(interaction: discord.Interaction, item_name: str):
     """Check the price of a specific item."""
     await interaction.response.defer()
     
-    shop_data = fetch_shop()
-    if not shop_data:
+    snapshot = await shop_cache.get()
+    if not snapshot:
         await interaction.followup.send('Could not fetch the item shop.')
         return
     
     try:
-        if 'data' in shop_data and shop_data['data']:
-            entries = shop_data['data'].get('entries', [])
-            
-            for entry in entries:
-                if entry.get('brItems') and entry['brItems']:
-                    item = entry['brItems'][0]
-                    if item.get('name', '').lower() == item_name.lower():
-                        name = item.get('name', 'Unknown Item')
-                        price = entry.get('finalPrice', 0)
-                        original_price = entry.get('regularPrice', price)
-                        rarity = item.get('rarity', {}).get('displayValue', 'Common')
-                        
-                        embed = discord.Embed(
-                            title=f'💰 {name}',
-                            color=get_rarity_color(rarity)
-                        )
-                        
-                        embed.add_field(name="Current Price", value=f"{price} V-Bucks", inline=True)
-                        if original_price != price:
-                            embed.add_field(name="Original Price", value=f"{original_price} V-Bucks", inline=True)
-                            discount = original_price - price
-                            embed.add_field(name="Discount", value=f"Save {discount} V-Bucks! 🎉", inline=True)
-                        
-                        embed.add_field(name="Rarity", value=rarity, inline=True)
-                        embed.add_field(name="Type", value=item.get('type', {}).get('displayValue', 'Item'), inline=True)
-                        
-                        # Add item icon if available
-                        if item.get('images') and item['images'].get('icon'):
-                            embed.set_thumbnail(url=item['images']['icon'])
-                        
-                        await interaction.followup.send(embed=embed)
-                        return
+        message = render_cache.get(snapshot, 'price', (item_name,), build_price_message)
+        await interaction.followup.send(**message)
             
-            await interaction.followup.send(f'Item "{item_name}" not found in the current shop.')
-        else:
-            await interaction.followup.send('No shop data available.')
-            
-    except Exception as e:
-        print(f'Error in price command: {e}')
+    except Exception:
+        log.exception('Error in price command')
         await interaction.followup.send('Error checking item price.')
 
+price.autocomplete('item_name')(item_name_autocomplete)
+
+def build_price_message(snapshot, item_name):
+    """Build the /price reply for an item name."""
+    entry = snapshot.find(item_name)
+    if not entry:
+        return {'content': f'Item "{item_name}" not found in the current shop.'}
+    
+    item = entry.item
+    price = entry.final_price
+    original_price = entry.regular_price
+    
+    embed = discord.Embed(
+        title=f'💰 {item.name}',
+        color=get_rarity_color(item.rarity)
+    )
+    
+    embed.add_field(name="Current Price", value=f"{price} V-Bucks", inline=True)
+    if original_price != price:
+        embed.add_field(name="Original Price", value=f"{original_price} V-Bucks", inline=True)
+        discount = original_price - price
+        embed.add_field(name="Discount", value=f"Save {discount} V-Bucks! 🎉", inline=True)
+    
+    embed.add_field(name="Rarity", value=item.rarity, inline=True)
+    embed.add_field(name="Type", value=item.type, inline=True)
+    
+    # Add item icon if available
+    if item.icon_url:
+        embed.set_thumbnail(url=item.icon_url)
+    
+    return {'embed': embed}
+
 @bot.tree.command(name="deals", description="Show items that are on sale/discount")
 async def deals(interaction: discord.Interaction):
     """Show items that are on sale/discount."""
     await interaction.response.defer()
     
-    shop_data = fetch_shop()
-    if not shop_data:
+    snapshot = await shop_cache.get()
+    if not snapshot:
         await interaction.followup.send('Could not fetch the item shop.')
         return
     
     try:
-        if 'data' in shop_data and shop_data['data']:
-            entries = shop_data['data'].get('entries', [])
-            deals = []
-            
-            for entry in entries:
-                if entry.get('brItems') and entry['brItems']:
-                    original_price = entry.get('regularPrice', 0)
-                    final_price = entry.get('finalPrice', 0)
-                    
-                    if final_price < original_price:
-                        item = entry['brItems'][0]
-                        name = item.get('name', 'Unknown Item')
-                        discount = original_price - final_price
-                        discount_percent = int((discount / original_price) * 100)
-                        
-                        deals.append({
-                            'name': name,
-                            'original': original_price,
-                            'final': final_price,
-                            'discount': discount,
-                            'percent': discount_percent,
-                            'item': item,
-                            'entry': entry
-                        })
+        message = render_cache.get(snapshot, 'deals', (), build_deals_message)
+        await interaction.followup.send(**message)
             
-            if deals:
-                # Sort by discount percentage (highest first)
-                deals.sort(key=lambda x: x['percent'], reverse=True)
-                
-                embed = discord.Embed(
-                    title='🔥 Hot Deals!',
-                    description='Items currently on sale:',
-                    color=0xFF6B35
-                )
-                
-                for i, deal in enumerate(deals[:8]):  # Show up to 8 deals
-                    embed.add_field(
-                        name=f"🎉 {deal['name']}",
-                        value=f"~~{deal['original']}~~ **{deal['final']}** V-Bucks\n"
-                              f"💸 Save {deal['discount']} V-Bucks ({deal['percent']}% off!)",
-                        inline=False
-                    )
-                
-                await interaction.followup.send(embed=embed)
-            else:
-                await interaction.followup.send('No items are currently on sale.')
-        else:
-            await interaction.followup.send('No shop data available.')
-            
-    except Exception as e:
-        print(f'Error in deals command: {e}')
+    except Exception:
+        log.exception('Error in deals command')
         await interaction.followup.send('Error fetching deals.')
 
+def build_deals_message(snapshot):
+    """Build the /deals reply."""
+    # Already sorted by discount percentage (highest first)
+    deals = snapshot.ranking.top_deals(limit=8)
+    
+    if deals:
+        embed = discord.Embed(
+            title='🔥 Hot Deals!',
+            description='Items currently on sale:',
+            color=0xFF6B35
+        )
+        
+        for percent, entry in deals:  # Show up to 8 deals
+            embed.add_field(
+                name=f"🎉 {entry.item.name}",
+                value=f"~~{entry.regular_price}~~ **{entry.final_price}** V-Bucks\n"
+                      f"💸 Save {entry.discount} V-Bucks ({percent}% off!)",
+                inline=False
+            )
+        
+        return {'embed': embed}
+    else:
+        return {'content': 'No items are currently on sale.'}
+
 @bot.tree.command(name="stats", description="Show shop statistics")
 async def stats(interaction: discord.Interaction):
     """Show shop statistics."""
     await interaction.response.defer()
     
-    shop_data = fetch_shop()
-    if not shop_data:
+    snapshot = await shop_cache.get()
+    if not snapshot:
         await interaction.followup.send('Could not fetch the item shop.')
         return
     
     try:
-        if 'data' in shop_data and shop_data['data']:
-            entries = shop_data['data'].get('entries', [])
-            
-            total_items = len(entries)
-            total_value = sum(entry.get('finalPrice', 0) for entry in entries)
-            
-            # Count by rarity
-            rarity_counts = {}
-            type_counts = {}
-            
-            for entry in entries:
-                if entry.get('brItems') and entry['brItems']:
-                    item = entry['brItems'][0]
-                    rarity = item.get('rarity', {}).get('displayValue', 'Unknown')
-                    item_type = item.get('type', {}).get('displayValue', 'Unknown')
-                    
-                    rarity_counts[rarity] = rarity_counts.get(rarity, 0) + 1
-                    type_counts[item_type] = type_counts.get(item_type, 0) + 1
-            
-            embed = discord.Embed(
-                title='📊 Shop Statistics',
-                color=0x4A90E2
-            )
-            
-            embed.add_field(name="Total Items", value=total_items, inline=True)
-            embed.add_field(name="Total Value", value=f"{total_value:,} V-Bucks", inline=True)
+        message = render_cache.get(snapshot, 'stats', (), build_stats_message)
+        await interaction.followup.send(**message)
             
-            # Add rarity breakdown
-            rarity_text = "\n".join([f"{rarity}: {count}" for rarity, count in rarity_counts.items()])
-            if rarity_text:
-                embed.add_field(name="Rarity Breakdown", value=rarity_text, inline=True)
-            
-            # Add type breakdown
-            type_text = "\n".join([f"{item_type}: {count}" for item_type, count in type_counts.items()])
-            if type_text:
-                embed.add_field(name="Type Breakdown", value=type_text, inline=True)
-            
-            await interaction.followup.send(embed=embed)
-        else:
-            await interaction.followup.send('No shop data available.')
-            
-    except Exception as e:
-        print(f'Error in stats command: {e}')
+    except Exception:
+        log.exception('Error in stats command')
         await interaction.followup.send('Error fetching shop statistics.')
 
+def build_stats_message(snapshot):
+    """Build the /stats reply."""
+    total_items = snapshot.total_entries
+    total_value = snapshot.total_value
+    
+    # Count by rarity
+    rarity_counts = {}
+    type_counts = {}
+    
+    for entry in snapshot.entries:
+        rarity = entry.item.rarity
+        item_type = entry.item.type
+        
+        rarity_counts[rarity] = rarity_counts.get(rarity, 0) + 1
+        type_counts[item_type] = type_counts.get(item_type, 0) + 1
+    
+    embed = discord.Embed(
+        title='📊 Shop Statistics',
+        color=0x4A90E2
+    )
+    
+    embed.add_field(name="Total Items", value=total_items, inline=True)
+    embed.add_field(name="Total Value", value=f"{total_value:,} V-Bucks", inline=True)
+    
+    # Add rarity breakdown
+    rarity_text = "\n".join([f"{rarity}: {count}" for rarity, count in rarity_counts.items()])
+    if rarity_text:
+        embed.add_field(name="Rarity Breakdown", value=rarity_text, inline=True)
+    
+    # Add type breakdown
+    type_text = "\n".join([f"{item_type}: {count}" for item_type, count in type_counts.items()])
+    if type_text:
+        embed.add_field(name="Type Breakdown", value=type_text, inline=True)
+    
+    return {'embed': embed}
+
 @bot.tree.command(name="help", description="Show all available commands")
 async def help_command(interaction: discord.Interaction):
     """Show all available commands."""
@@ -380,7 +519,7 @@ async def help_command(interaction: discord.Interaction):
     )
     
     commands_info = [
-        ("`/shop`", "Show the current Fortnite item shop with icons and details"),
+        ("`/shop`", "Browse the current Fortnite item shop page by page, with rarity and type filters"),
         ("`/item <name>`", "Show detailed information about a specific item"),
         ("`/search <query>`", "Search for items in the current shop"),
         ("`/price <item>`", "Check the price of a specific item"),
@@ -388,9 +527,14 @@ async def help_command(interaction: discord.Interaction):
         ("`/stats`", "Show shop statistics and breakdown"),
         ("`/rarity <type>`", "Show items filtered by rarity (Common, Rare, Epic, etc.)"),
         ("`/type <type>`", "Show items filtered by type (Outfit, Backpack, Pickaxe, etc.)"),
-        ("`/expensive`", "Show the most expensive items in the shop"),
-        ("`/cheap`", "Show the cheapest items in the shop"),
+        ("`/expensive [rarity] [type]`", "Show the most expensive items in the shop"),
+        ("`/cheap [rarity] [type]`", "Show the cheapest items in the shop"),
         ("`/bundles`", "Show all bundle items in the shop"),
+        ("`/lastseen <item>`", "Show when an item was last in the shop"),
+        ("`/history <item>`", "Show every day an item has been in the shop"),
+        ("`/watch <item>`", "Get a DM when an item is back in the shop"),
+        ("`/unwatch <item>`", "Stop alerts for an item"),
+        ("`/watchlist`", "Show the items you are watching"),
         ("`/info`", "Show bot information and status"),
         ("`/setshopchannel <channel>`", "Set up automatic shop updates (Admin only)"),
         ("`/help`", "Show this help message")
@@ -416,54 +560,44 @@ async def rarity(interaction: discord.Interaction, rarity_type: str):
         await interaction.followup.send(f'Invalid rarity. Please choose from: {", ".join(valid_rarities).title()}')
         return
     
-    shop_data = fetch_shop()
-    if not shop_data:
+    snapshot = await shop_cache.get()
+    if not snapshot:
         await interaction.followup.send('Could not fetch the item shop.')
         return
     
     try:
-        if 'data' in shop_data and shop_data['data']:
-            entries = shop_data['data'].get('entries', [])
-            rarity_items = []
+        message = render_cache.get(snapshot, 'rarity', (rarity_type,), build_rarity_message)
+        await interaction.followup.send(**message)
             
-            for entry in entries:
-                if entry.get('brItems') and entry['brItems']:
-                    item = entry['brItems'][0]
-                    item_rarity = item.get('rarity', {}).get('value', '').lower()
-                    
-                    if item_rarity == rarity_type:
-                        name = item.get('name', 'Unknown Item')
-                        price = entry.get('finalPrice', 0)
-                        item_type = item.get('type', {}).get('displayValue', 'Item')
-                        rarity_items.append((name, price, item_type, item, entry))
-            
-            if rarity_items:
-                embed = discord.Embed(
-                    title=f'⭐ {rarity_type.title()} Items',
-                    description=f'All {rarity_type.title()} items currently in the shop:',
-                    color=get_rarity_color(rarity_type.title())
-                )
-                
-                for i, (name, price, item_type, item, entry) in enumerate(rarity_items[:10]):
-                    embed.add_field(
-                        name=f"{i+1}. {name}",
-                        value=f"💰 {price} V-Bucks | 📦 {item_type}",
-                        inline=False
-                    )
-                
-                if len(rarity_items) > 10:
-                    embed.set_footer(text=f"Showing 10 of {len(rarity_items)} {rarity_type.title()} items")
-                
-                await interaction.followup.send(embed=embed)
-            else:
-                await interaction.followup.send(f'No {rarity_type.title()} items found in the current shop.')
-        else:
-            await interaction.followup.send('No shop data available.')
-            
-    except Exception as e:
-        print(f'Error in rarity command: {e}')
+    except Exception:
+        log.exception('Error in rarity command')
         await interaction.followup.send('Error fetching rarity items.')
 
+def build_rarity_message(snapshot, rarity_type):
+    """Build the /rarity reply for a validated rarity."""
+    rarity_items = snapshot.with_rarity(rarity_type)
+    
+    if rarity_items:
+        embed = discord.Embed(
+            title=f'⭐ {rarity_type.title()} Items',
+            description=f'All {rarity_type.title()} items currently in the shop:',
+            color=get_rarity_color(rarity_type.title())
+        )
+        
+        for i, entry in enumerate(rarity_items[:10]):
+            embed.add_field(
+                name=f"{i+1}. {entry.item.name}",
+                value=f"💰 {entry.final_price} V-Bucks | 📦 {entry.item.type}",
+                inline=False
+            )
+        
+        if len(rarity_items) > 10:
+            embed.set_footer(text=f"Showing 10 of {len(rarity_items)} {rarity_type.title()} items")
+        
+        return {'embed': embed}
+    else:
+        return {'content': f'No {rarity_type.title()} items found in the current shop.'}
+
 @bot.tree.command(name="type", description="Show items by type")
 async def type_filter(interaction: discord.Interaction, item_type: str):
     """Show items filtered by type."""
@@ -477,204 +611,177 @@ async def type_filter(interaction: discord.Interaction, item_type: str):
         await interaction.followup.send(f'Invalid type. Please choose from: {", ".join(valid_types).title()}')
         return
     
-    shop_data = fetch_shop()
-    if not shop_data:
+    snapshot = await shop_cache.get()
+    if not snapshot:
         await interaction.followup.send('Could not fetch the item shop.')
         return
     
     try:
-        if 'data' in shop_data and shop_data['data']:
-            entries = shop_data['data'].get('entries', [])
-            type_items = []
-            
-            for entry in entries:
-                if entry.get('brItems') and entry['brItems']:
-                    item = entry['brItems'][0]
-                    item_type_value = item.get('type', {}).get('value', '').lower()
-                    
-                    if item_type_value == item_type:
-                        name = item.get('name', 'Unknown Item')
-                        price = entry.get('finalPrice', 0)
-                        rarity = item.get('rarity', {}).get('displayValue', 'Common')
-                        type_items.append((name, price, rarity, item, entry))
+        message = render_cache.get(snapshot, 'type', (item_type,), build_type_message)
+        await interaction.followup.send(**message)
             
-            if type_items:
-                embed = discord.Embed(
-                    title=f'📦 {item_type.title()} Items',
-                    description=f'All {item_type.title()} items currently in the shop:',
-                    color=0x4A90E2
-                )
-                
-                for i, (name, price, rarity, item, entry) in enumerate(type_items[:10]):
-                    embed.add_field(
-                        name=f"{i+1}. {name}",
-                        value=f"💰 {price} V-Bucks | ⭐ {rarity}",
-                        inline=False
-                    )
-                
-                if len(type_items) > 10:
-                    embed.set_footer(text=f"Showing 10 of {len(type_items)} {item_type.title()} items")
-                
-                await interaction.followup.send(embed=embed)
-            else:
-                await interaction.followup.send(f'No {item_type.title()} items found in the current shop.')
-        else:
-            await interaction.followup.send('No shop data available.')
-            
-    except Exception as e:
-        print(f'Error in type command: {e}')
+    except Exception:
+        log.exception('Error in type command')
         await interaction.followup.send('Error fetching type items.')
 
+def build_type_message(snapshot, item_type):
+    """Build the /type reply for a validated item type."""
+    type_items = snapshot.with_type(item_type)
+    
+    if type_items:
+        embed = discord.Embed(
+            title=f'📦 {item_type.title()} Items',
+            description=f'All {item_type.title()} items currently in the shop:',
+            color=0x4A90E2
+        )
+        
+        for i, entry in enumerate(type_items[:10]):
+            embed.add_field(
+                name=f"{i+1}. {entry.item.name}",
+                value=f"💰 {entry.final_price} V-Bucks | ⭐ {entry.item.rarity}",
+                inline=False
+            )
+        
+        if len(type_items) > 10:
+            embed.set_footer(text=f"Showing 10 of {len(type_items)} {item_type.title()} items")
+        
+        return {'embed': embed}
+    else:
+        return {'content': f'No {item_type.title()} items found in the current shop.'}
+
+def filter_entries(snapshot, rarity=None, item_type=None):
+    """Return the entries matching the optional rarity/type filters, or None for no filter."""
+    if not rarity and not item_type:
+        return None
+    if rarity and item_type:
+        of_type = set(map(id, snapshot.with_type(item_type)))
+        return [entry for entry in snapshot.with_rarity(rarity) if id(entry) in of_type]
+    if rarity:
+        return snapshot.with_rarity(rarity)
+    return snapshot.with_type(item_type)
+
 @bot.tree.command(name="expensive", description="Show the most expensive items in the shop")
-async def expensive(interaction: discord.Interaction):
-    """Show the most expensive items in the shop."""
+async def expensive(interaction: discord.Interaction, rarity: str = None, item_type: str = None):
+    """Show the most expensive items in the shop, optionally filtered by rarity and type."""
     await interaction.response.defer()
     
-    shop_data = fetch_shop()
-    if not shop_data:
+    snapshot = await shop_cache.get()
+    if not snapshot:
         await interaction.followup.send('Could not fetch the item shop.')
         return
     
     try:
-        if 'data' in shop_data and shop_data['data']:
-            entries = shop_data['data'].get('entries', [])
-            price_items = []
-            
-            for entry in entries:
-                if entry.get('brItems') and entry['brItems']:
-                    item = entry['brItems'][0]
-                    name = item.get('name', 'Unknown Item')
-                    price = entry.get('finalPrice', 0)
-                    rarity = item.get('rarity', {}).get('displayValue', 'Common')
-                    item_type = item.get('type', {}).get('displayValue', 'Item')
-                    price_items.append((name, price, rarity, item_type, item, entry))
+        message = render_cache.get(snapshot, 'expensive', (rarity, item_type), build_expensive_message)
+        await interaction.followup.send(**message)
             
-            if price_items:
-                # Sort by price (highest first)
-                price_items.sort(key=lambda x: x[1], reverse=True)
-                
-                embed = discord.Embed(
-                    title='💰 Most Expensive Items',
-                    description='Top 10 most expensive items in the shop:',
-                    color=0xFFD700
-                )
-                
-                for i, (name, price, rarity, item_type, item, entry) in enumerate(price_items[:10]):
-                    embed.add_field(
-                        name=f"{i+1}. {name}",
-                        value=f"💰 **{price:,}** V-Bucks | ⭐ {rarity} | 📦 {item_type}",
-                        inline=False
-                    )
-                
-                await interaction.followup.send(embed=embed)
-            else:
-                await interaction.followup.send('No items found in the shop.')
-        else:
-            await interaction.followup.send('No shop data available.')
-            
-    except Exception as e:
-        print(f'Error in expensive command: {e}')
+    except Exception:
+        log.exception('Error in expensive command')
         await interaction.followup.send('Error fetching expensive items.')
 
+def build_expensive_message(snapshot, rarity=None, item_type=None):
+    """Build the /expensive reply."""
+    candidates = filter_entries(snapshot, rarity, item_type)
+    price_items = snapshot.ranking.most_expensive(limit=10, candidates=candidates)
+    
+    if price_items:
+        embed = discord.Embed(
+            title='💰 Most Expensive Items',
+            description='Top 10 most expensive items in the shop:',
+            color=0xFFD700
+        )
+        
+        for i, entry in enumerate(price_items):
+            embed.add_field(
+                name=f"{i+1}. {entry.item.name}",
+                value=f"💰 **{entry.final_price:,}** V-Bucks | ⭐ {entry.item.rarity} | 📦 {entry.item.type}",
+                inline=False
+            )
+        
+        return {'embed': embed}
+    else:
+        return {'content': 'No items found in the shop.'}
+
 @bot.tree.command(name="cheap", description="Show the cheapest items in the shop")
-async def cheap(interaction: discord.Interaction):
-    """Show the cheapest items in the shop."""
+async def cheap(interaction: discord.Interaction, rarity: str = None, item_type: str = None):
+    """Show the cheapest items in the shop, optionally filtered by rarity and type."""
     await interaction.response.defer()
     
-    shop_data = fetch_shop()
-    if not shop_data:
+    snapshot = await shop_cache.get()
+    if not snapshot:
         await interaction.followup.send('Could not fetch the item shop.')
         return
     
     try:
-        if 'data' in shop_data and shop_data['data']:
-            entries = shop_data['data'].get('entries', [])
-            price_items = []
-            
-            for entry in entries:
-                if entry.get('brItems') and entry['brItems']:
-                    item = entry['brItems'][0]
-                    name = item.get('name', 'Unknown Item')
-                    price = entry.get('finalPrice', 0)
-                    rarity = item.get('rarity', {}).get('displayValue', 'Common')
-                    item_type = item.get('type', {}).get('displayValue', 'Item')
-                    price_items.append((name, price, rarity, item_type, item, entry))
-            
-            if price_items:
-                # Sort by price (lowest first)
-                price_items.sort(key=lambda x: x[1])
-                
-                embed = discord.Embed(
-                    title='💸 Cheapest Items',
-                    description='Top 10 cheapest items in the shop:',
-                    color=0x2D8E47
-                )
-                
-                for i, (name, price, rarity, item_type, item, entry) in enumerate(price_items[:10]):
-                    embed.add_field(
-                        name=f"{i+1}. {name}",
-                        value=f"💰 **{price:,}** V-Bucks | ⭐ {rarity} | 📦 {item_type}",
-                        inline=False
-                    )
-                
-                await interaction.followup.send(embed=embed)
-            else:
-                await interaction.followup.send('No items found in the shop.')
-        else:
-            await interaction.followup.send('No shop data available.')
+        message = render_cache.get(snapshot, 'cheap', (rarity, item_type), build_cheap_message)
+        await interaction.followup.send(**message)
             
-    except Exception as e:
-        print(f'Error in cheap command: {e}')
+    except Exception:
+        log.exception('Error in cheap command')
         await interaction.followup.send('Error fetching cheap items.')
 
+def build_cheap_message(snapshot, rarity=None, item_type=None):
+    """Build the /cheap reply."""
+    candidates = filter_entries(snapshot, rarity, item_type)
+    price_items = snapshot.ranking.cheapest(limit=10, candidates=candidates)
+    
+    if price_items:
+        embed = discord.Embed(
+            title='💸 Cheapest Items',
+            description='Top 10 cheapest items in the shop:',
+            color=0x2D8E47
+        )
+        
+        for i, entry in enumerate(price_items):
+            embed.add_field(
+                name=f"{i+1}. {entry.item.name}",
+                value=f"💰 **{entry.final_price:,}** V-Bucks | ⭐ {entry.item.rarity} | 📦 {entry.item.type}",
+                inline=False
+            )
+        
+        return {'embed': embed}
+    else:
+        return {'content': 'No items found in the shop.'}
+
 @bot.tree.command(name="bundles", description="Show all bundle items in the shop")
 async def bundles(interaction: discord.Interaction):
     """Show all bundle items in the shop."""
     await interaction.response.defer()
     
-    shop_data = fetch_shop()
-    if not shop_data:
+    snapshot = await shop_cache.get()
+    if not snapshot:
         await interaction.followup.send('Could not fetch the item shop.')
         return
     
     try:
-        if 'data' in shop_data and shop_data['data']:
-            entries = shop_data['data'].get('entries', [])
-            bundle_items = []
+        message = render_cache.get(snapshot, 'bundles', (), build_bundles_message)
+        await interaction.followup.send(**message)
             
-            for entry in entries:
-                if entry.get('bundle') and entry.get('brItems') and entry['brItems']:
-                    item = entry['brItems'][0]
-                    name = item.get('name', 'Unknown Item')
-                    price = entry.get('finalPrice', 0)
-                    bundle_name = entry['bundle'].get('name', 'Unknown Bundle')
-                    rarity = item.get('rarity', {}).get('displayValue', 'Common')
-                    bundle_items.append((name, price, bundle_name, rarity, item, entry))
-            
-            if bundle_items:
-                embed = discord.Embed(
-                    title='📦 Bundle Items',
-                    description='All bundle items currently in the shop:',
-                    color=0x9B4F96
-                )
-                
-                for i, (name, price, bundle_name, rarity, item, entry) in enumerate(bundle_items):
-                    embed.add_field(
-                        name=f"{i+1}. {name}",
-                        value=f"📦 **{bundle_name}**\n💰 {price:,} V-Bucks | ⭐ {rarity}",
-                        inline=False
-                    )
-                
-                await interaction.followup.send(embed=embed)
-            else:
-                await interaction.followup.send('No bundle items found in the current shop.')
-        else:
-            await interaction.followup.send('No shop data available.')
-            
-    except Exception as e:
-        print(f'Error in bundles command: {e}')
+    except Exception:
+        log.exception('Error in bundles command')
         await interaction.followup.send('Error fetching bundle items.')
 
+def build_bundles_message(snapshot):
+    """Build the /bundles reply."""
+    bundle_items = snapshot.bundles
+    
+    if bundle_items:
+        embed = discord.Embed(
+            title='📦 Bundle Items',
+            description='All bundle items currently in the shop:',
+            color=0x9B4F96
+        )
+        
+        for i, entry in enumerate(bundle_items):
+            embed.add_field(
+                name=f"{i+1}. {entry.item.name}",
+                value=f"📦 **{entry.bundle_name}**\n💰 {entry.final_price:,} V-Bucks | ⭐ {entry.item.rarity}",
+                inline=False
+            )
+        
+        return {'embed': embed}
+    else:
+        return {'content': 'No bundle items found in the current shop.'}
+
 @bot.tree.command(name="info", description="Show bot information and status")
 async def info(interaction: discord.Interaction):
     """Show bot information and status."""
@@ -692,7 +799,7 @@ async def info(interaction: discord.Interaction):
     # Bot stats
     embed.add_field(
         name="📊 Bot Status",
-        value=f"✅ Online\n🕐 Uptime: Running\n🔄 Auto-updates: {'Enabled' if shop_channel_id else 'Disabled'}",
+        value=f"✅ Online\n🕐 Uptime: Running\n🔄 Auto-updates: {f'Enabled in {len(channel_registry)} server(s)' if channel_registry else 'Disabled'}",
         inline=False
     )
     
@@ -706,14 +813,31 @@ async def info(interaction: discord.Interaction):
     # Commands count
     embed.add_field(
         name="📋 Commands",
-        value="14 total commands available",
+        value=f"{len(bot.tree.get_commands())} total commands available",
         inline=True
     )
     
-    # API Status
+    # API Status, one line per endpoint with its circuit breaker state
+    breaker_icons = {'closed': '✅', 'half_open': '🟡', 'open': '⛔'}
+    endpoint_lines = '\n'.join(
+        f"{breaker_icons[get_breaker(url).state]} {endpoint_name(url)}" for url in endpoints()
+    )
     embed.add_field(
         name="🌐 API Status",
-        value="✅ Fortnite API Connected",
+        value=f"{endpoint_lines}\n"
+              f"📡 Requests: {fetch_stats['requests']} "
+              f"({fetch_stats['not_modified']} not modified, {fetch_stats['errors']} failed, "
+              f"{fetch_stats['retries']} retries, {fetch_stats['hedged']} hedged)",
+        inline=True
+    )
+    
+    # Image cache
+    image_stats = image_cache.stats
+    embed.add_field(
+        name="🖼️ Image Cache",
+        value=f"{image_cache.total_bytes / 1048576:.1f} MB\n"
+              f"{image_stats['hits']} hits ({image_stats['revalidated']} revalidated), "
+              f"{image_stats['misses']} misses, {image_stats['evictions']} evicted",
         inline=True
     )
     
@@ -721,125 +845,375 @@ async def info(interaction: discord.Interaction):
     
     await interaction.response.send_message(embed=embed, ephemeral=True)
 
-def fetch_shop():
-    """Fetch the current Fortnite item shop data."""
-    try:
-        response = requests.get(FORTNITE_API_URL, timeout=10)
-        if response.status_code == 200:
-            return response.json()
-        else:
-            print(f'API request failed with status code: {response.status_code}')
-    except requests.RequestException as e:
-        print(f'Error fetching shop: {e}')
-    except json.JSONDecodeError as e:
-        print(f'Error parsing JSON response: {e}')
-    return None
+def shop_page_embed(index):
+    """Create an empty page for the full shop listing."""
+    if index == 0:
+        return discord.Embed(
+            title='🛒 Fortnite Item Shop - All Items', 
+            color=0x00ff00,
+            description='📋 **Complete list of all items currently in the shop:**\n━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━'
+        )
+    return discord.Embed(
+        title='🛒 Fortnite Item Shop - All Items (Continued)', 
+        color=0x00ff00,
+        description='📋 **More items from the shop:**\n━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━'
+    )
 
-def format_shop_embed(shop_data):
-    """Format the shop data into a Discord embed."""
+def shop_field(i, entry):
+    """Return the (name, value, inline) field listing one shop entry."""
+    item = entry.item
+    price = entry.final_price
+    
+    # Add bundle info if available
+    bundle_info = ""
+    if entry.bundle_name:
+        bundle_info = f" (Bundle: {entry.bundle_name})"
+    
+    # Check if item is on sale
+    original_price = entry.regular_price
+    sale_info = ""
+    if original_price != price:
+        discount = original_price - price
+        sale_info = f"💰 ~~{original_price}~~ **{price}** V-Bucks 💸 **SAVE {discount}!**"
+    else:
+        sale_info = f"💰 **{price}** V-Bucks"
+    
+    # Create item field with better formatting
+    item_text = f"{sale_info}\n"
+    item_text += f"⭐ *{item.rarity} {item.type}*{bundle_info}"
+    
+    return (f"{i+1}. {item.name}", item_text, False)
+
+SHOP_PAGE_SIZE = 10  # Items per page in the interactive /shop view
+
+def build_shop_page(snapshot, rarity, item_type, page):
+    """Render one page of the interactive /shop view as (embed, page, page_count)."""
+    candidates = filter_entries(snapshot, rarity, item_type)
+    entries = snapshot.entries if candidates is None else candidates
+    page_count = max(1, -(-len(entries) // SHOP_PAGE_SIZE))
+    page = min(max(page, 0), page_count - 1)
+    
+    if not entries:
+        return discord.Embed(title="No items found in the shop.", color=0xff0000), page, page_count
+    
+    embed = shop_page_embed(page)
+    start = page * SHOP_PAGE_SIZE
+    for i, entry in enumerate(entries[start:start + SHOP_PAGE_SIZE], start):
+        name, value, inline = shop_field(i, entry)
+        embed.add_field(name=name, value=value, inline=inline)
+    
+    filters = ' '.join(value.title() for value in (rarity, item_type) if value)
+    footer = f"Page {page + 1}/{page_count}"
+    if filters:
+        footer += f" • {filters} ({len(entries)} items)"
+    embed.set_footer(text=footer + " • Shop updates every 24 hours")
+    
+    if page == 0 and entries[0].item.icon_url:
+        embed.set_thumbnail(url=entries[0].item.icon_url)
+    
+    return embed, page, page_count
+
+def format_shop_embed(snapshot):
+    """Format the shop snapshot into Discord embeds, as full as the limits allow."""
     try:
-        if 'data' in shop_data and shop_data['data']:
-            entries = shop_data['data'].get('entries', [])
+        entries = snapshot.entries
+        
+        if entries:
+            fields = [shop_field(i, entry) for i, entry in enumerate(entries)]
+            embeds = pack_fields(fields, shop_page_embed)
+            for page, embed in enumerate(embeds, 1):
+                embed.set_footer(text=f"Page {page} • Shop updates every 24 hours")
+            
+            # Set thumbnail to first item's icon if available
+            if entries[0].item.icon_url:
+                embeds[0].set_thumbnail(url=entries[0].item.icon_url)
             
-            if entries:
-                # Create multiple embeds to show all items
-                embeds = []
-                current_embed = discord.Embed(
-                    title='🛒 Fortnite Item Shop - All Items', 
-                    color=0x00ff00,
-                    description='📋 **Complete list of all items currently in the shop:**\n━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━'
-                )
-                
-                item_count = 0
-                items_per_embed = 8  # Reduced for better readability
-                
-                for i, entry in enumerate(entries):
-                    if entry.get('brItems') and entry['brItems']:
-                        item = entry['brItems'][0]
-                        name = item.get('name', 'Unknown Item')
-                        price = entry.get('finalPrice', 0)
-                        rarity = item.get('rarity', {}).get('displayValue', 'Common')
-                        item_type = item.get('type', {}).get('displayValue', 'Item')
-                        
-                        # Add bundle info if available
-                        bundle_info = ""
-                        if entry.get('bundle'):
-                            bundle_info = f" (Bundle: {entry['bundle']['name']})"
-                        
-                        # Check if item is on sale
-                        original_price = entry.get('regularPrice', price)
-                        sale_info = ""
-                        if original_price != price:
-                            discount = original_price - price
-                            sale_info = f"💰 ~~{original_price}~~ **{price}** V-Bucks 💸 **SAVE {discount}!**"
-                        else:
-                            sale_info = f"💰 **{price}** V-Bucks"
-                        
-                        # Create item field with better formatting
-                        item_text = f"{sale_info}\n"
-                        item_text += f"⭐ *{rarity} {item_type}*{bundle_info}"
-                        
-                        # Add to current embed with better spacing
-                        current_embed.add_field(
-                            name=f"{i+1}. {name}",
-                            value=item_text,
-                            inline=False  # Changed to False for better readability
-                        )
-                        
-                        item_count += 1
-                        
-                        # Create new embed if we've reached the limit
-                        if item_count >= items_per_embed:
-                            current_embed.set_footer(text=f"Page {len(embeds) + 1} • Shop updates every 24 hours")
-                            embeds.append(current_embed)
-                            
-                            # Start new embed
-                            current_embed = discord.Embed(
-                                title='🛒 Fortnite Item Shop - All Items (Continued)', 
-                                color=0x00ff00,
-                                description='📋 **More items from the shop:**\n━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━'
-                            )
-                            item_count = 0
-                
-                # Add the last embed if it has items
-                if item_count > 0:
-                    current_embed.set_footer(text=f"Page {len(embeds) + 1} • Shop updates every 24 hours")
-                    embeds.append(current_embed)
-                
-                # Set thumbnail to first item's icon if available
-                if entries and entries[0].get('brItems') and entries[0]['brItems']:
-                    first_item = entries[0]['brItems'][0]
-                    if first_item.get('images') and first_item['images'].get('icon'):
-                        embeds[0].set_thumbnail(url=first_item['images']['icon'])
-                
-                return embeds if embeds else [discord.Embed(title="No items found in the shop.", color=0xff0000)]
-            else:
-                return [discord.Embed(title="No items found in the shop.", color=0xff0000)]
+            return embeds
         else:
-            return [discord.Embed(title="No shop data available.", color=0xff0000)]
+            return [discord.Embed(title="No items found in the shop.", color=0xff0000)]
             
-    except Exception as e:
-        print(f'Error formatting shop embed: {e}')
+    except Exception:
+        log.exception('Error formatting shop embed')
         return [discord.Embed(title="Error loading shop data.", color=0xff0000)]
 
-@tasks.loop(minutes=10)
+def format_shop_messages(snapshot):
+    """Group the shop embeds into as few messages as possible."""
+    return group_embeds(format_shop_embed(snapshot))
+
+def build_update_messages(snapshot, image_paths=()):
+    """Build the messages posted to every update channel when the shop changes."""
+    groups = render_cache.get(snapshot, 'shop', (), format_shop_messages)
+    
+    # Update notification with the first group, then the rest of the pages
+    messages = [{
+        'content': '🆕 **The Fortnite Item Shop has updated!**',
+        'embeds': groups[0]
+    }]
+    messages.extend({'embeds': embeds} for embeds in groups[1:])
+    # The shop images go last, split to fit the upload limit, so a refused
+    # upload never costs a guild the text
+    messages.extend({'file_paths': group} for group in attachment_groups(image_paths))
+    return messages
+
 async def check_shop_update():
-    global last_shop_data
-    if shop_channel_id is None:
+    """Refresh the shop and post it if it changed; returns None if the refresh failed."""
+    started = time.perf_counter()
+    outcome = 'error'
+    try:
+        outcome, snapshot = await update_shop()
+        return snapshot
+    finally:
+        update_seconds.observe(time.perf_counter() - started, outcome)
+
+async def update_shop():
+    """Do the work of check_shop_update; returns (outcome, snapshot)."""
+    snapshot = await shop_cache.refresh()
+    if shop_cache.failures:
+        return 'failed', None
+    shop_store.save_snapshot(snapshot)
+    cluster.publish(snapshot)
+    await shop_archive.archive(snapshot)
+    queue_watch_alerts(snapshot)
+    return await announce_shop(snapshot), snapshot
+
+async def announce_shop(snapshot):
+    """Post the shop to this process's update channels if it changed; returns the outcome."""
+    global last_shop_fingerprint
+    if not channel_registry:
+        shop_images.prefetch(snapshot)
+        return 'no_channels'
+    if snapshot.fingerprint != last_shop_fingerprint:
+        last_shop_fingerprint = snapshot.fingerprint
+        shop_store.save_announced(last_shop_fingerprint)
+        # Rendered once per rotation and shared by every channel and /shop. A slow
+        # CDN only holds the update back IMAGE_RENDER_WAIT seconds; /shop picks up
+        # the images once the render finishes.
+        image_paths = await shop_images.render(snapshot, IMAGE_RENDER_WAIT) or ()
+        messages = render_cache.get(snapshot, 'update', (tuple(image_paths),), build_update_messages)
+        await broadcaster.broadcast(messages, cluster.owns_guild)
+        return 'broadcast'
+    return 'unchanged'
+
+async def become_leader():
+    """Start the work only one process does: polling the shop and sending alerts."""
+    shop_scheduler.start()
+    alert_queue.start()
+
+async def follow_snapshot(snapshot):
+    """Serve and announce a snapshot polled by the leader process."""
+    shop_cache.store(snapshot)
+    # The leader sent the alerts for it and wrote it to the archive
+    watch_list.seen(snapshot)
+    shop_archive.index(snapshot)
+    await announce_shop(snapshot)
+
+async def sync_watches():
+    """Reload the watch list when another process has changed it."""
+    # Our own queued changes go first so the reload includes them
+    await shop_store.flush()
+    version = await shop_store.watches_version()
+    if version != watch_list.version:
+        watch_list.reload(await shop_store.load_watches())
+        watch_list.version = version
+
+@bot.tree.command(name="lastseen", description="Show when an item was last in the shop")
+async def lastseen(interaction: discord.Interaction, item_name: str):
+    """Show when an item was last in the shop."""
+    item_id = shop_archive.resolve(item_name)
+    if item_id is None:
+        await interaction.response.send_message(f'Item "{item_name}" has not been seen in the shop yet.')
         return
-    shop_data = fetch_shop()
-    if shop_data and shop_data != last_shop_data:
-        last_shop_data = shop_data
-        channel = bot.get_channel(shop_channel_id)
-        if channel:
-            embeds = format_shop_embed(shop_data)
-            
-            # Send update notification with first embed
-            await channel.send('🆕 **The Fortnite Item Shop has updated!**', embed=embeds[0])
-            
-            # Send additional embeds if there are more
-            for embed in embeds[1:]:
-                await channel.send(embed=embed)
+    
+    name, rarity, item_type = shop_archive.item(item_id)
+    appearances = shop_archive.history(item_id)
+    last = appearances[-1]
+    days = shop_archive.days_since(item_id)
+    
+    embed = discord.Embed(
+        title=f'📅 {name}',
+        color=get_rarity_color(rarity)
+    )
+    if days == 0:
+        embed.description = "In today's shop!"
+    else:
+        embed.description = f"Last seen {days} day{'s' if days != 1 else ''} ago"
+    embed.add_field(name="Last Seen", value=last.day, inline=True)
+    embed.add_field(name="Price", value=f"{last.final_price} V-Bucks", inline=True)
+    embed.add_field(name="Appearances", value=len(appearances), inline=True)
+    embed.add_field(name="First Seen", value=appearances[0].day, inline=True)
+    embed.set_footer(text=f"{rarity} {item_type}")
+    
+    await interaction.response.send_message(embed=embed)
+
+@bot.tree.command(name="history", description="Show every day an item has been in the shop")
+async def history(interaction: discord.Interaction, item_name: str):
+    """Show the shop history of an item."""
+    item_id = shop_archive.resolve(item_name)
+    if item_id is None:
+        await interaction.response.send_message(f'Item "{item_name}" has not been seen in the shop yet.')
+        return
+    
+    name, rarity, item_type = shop_archive.item(item_id)
+    appearances = shop_archive.history(item_id)
+    
+    embed = discord.Embed(
+        title=f'📜 {name} Shop History',
+        description=f"Seen on {len(appearances)} day{'s' if len(appearances) != 1 else ''} "
+                    f"since {appearances[0].day}",
+        color=get_rarity_color(rarity)
+    )
+    
+    # Most recent first
+    lines = []
+    for appearance in reversed(appearances[-15:]):
+        line = f"{appearance.day} - {appearance.final_price} V-Bucks"
+        if appearance.final_price != appearance.regular_price:
+            line += f" (was {appearance.regular_price})"
+        lines.append(line)
+    embed.add_field(name="Recent Appearances", value="\n".join(lines), inline=False)
+    
+    if len(appearances) > 15:
+        embed.set_footer(text=f"Showing the last 15 of {len(appearances)} appearances")
+    
+    await interaction.response.send_message(embed=embed)
+
+async def archived_item_autocomplete(interaction: discord.Interaction, current: str):
+    """Suggest item names from the shop archive for /lastseen and /history."""
+    return [
+        app_commands.Choice(name=name[:100], value=name[:100])
+        for name in shop_archive.complete(current, limit=25)
+    ]
+
+lastseen.autocomplete('item_name')(archived_item_autocomplete)
+history.autocomplete('item_name')(archived_item_autocomplete)
+
+def queue_watch_alerts(snapshot):
+    """DM every user whose watched items just entered the shop."""
+    for user_id, entries in watch_list.match(snapshot).items():
+        embed = discord.Embed(
+            title='👀 Your watched items are in the shop!',
+            color=0x00ff00
+        )
+        for entry in entries[:25]:
+            embed.add_field(
+                name=entry.item.name,
+                value=f"💰 {entry.final_price} V-Bucks | ⭐ {entry.item.rarity}",
+                inline=False
+            )
+        embed.set_footer(text="Use /unwatch to stop these alerts")
+        alert_queue.put(user_id, {'embed': embed})
+
+@bot.tree.command(name="watch", description="Get a DM when an item is back in the shop")
+async def watch(interaction: discord.Interaction, item_name: str):
+    """Subscribe to an alert for an item."""
+    item_id = shop_archive.resolve(item_name)
+    if item_id is not None:
+        name = shop_archive.item(item_id)[0]
+    else:
+        snapshot = shop_cache.peek()
+        entry = snapshot.find(item_name) if snapshot else None
+        if entry is None:
+            await interaction.response.send_message(f'Item "{item_name}" has not been seen in the shop yet.', ephemeral=True)
+            return
+        item_id, name = entry.item.id, entry.item.name
+    
+    if not watch_list.add(interaction.user.id, item_id, name):
+        await interaction.response.send_message(f'You can watch up to {watch_list.limit} items. Use /unwatch to remove one.', ephemeral=True)
+        return
+    await interaction.response.send_message(f"I'll DM you when **{name}** is in the item shop.", ephemeral=True)
+
+@bot.tree.command(name="unwatch", description="Stop alerts for an item")
+async def unwatch(interaction: discord.Interaction, item_name: str):
+    """Remove an item alert."""
+    watched = watch_list.watched(interaction.user.id)
+    key = item_name.strip().casefold()
+    item_id = next((item_id for item_id, name in watched.items() if name.casefold() == key), None)
+    if item_id is None or watch_list.remove(interaction.user.id, item_id) is None:
+        await interaction.response.send_message(f'You are not watching "{item_name}".', ephemeral=True)
+        return
+    await interaction.response.send_message(f'Stopped watching **{item_name}**.', ephemeral=True)
+
+@bot.tree.command(name="watchlist", description="Show the items you are watching")
+async def watchlist(interaction: discord.Interaction):
+    """Show a user's item alerts."""
+    watched = watch_list.watched(interaction.user.id)
+    if not watched:
+        await interaction.response.send_message('You are not watching any items. Use /watch to add one.', ephemeral=True)
+        return
+    
+    embed = discord.Embed(
+        title='👀 Your Watchlist',
+        description="\n".join(f"• {name}" for name in sorted(watched.values())),
+        color=0x4A90E2
+    )
+    embed.set_footer(text=f"{len(watched)}/{watch_list.limit} items")
+    await interaction.response.send_message(embed=embed, ephemeral=True)
+
+async def watched_item_autocomplete(interaction: discord.Interaction, current: str):
+    """Suggest the user's watched item names for /unwatch."""
+    current = current.casefold()
+    names = sorted(name for name in watch_list.watched(interaction.user.id).values() if current in name.casefold())
+    return [app_commands.Choice(name=name[:100], value=name[:100]) for name in names[:25]]
+
+watch.autocomplete('item_name')(archived_item_autocomplete)
+unwatch.autocomplete('item_name')(watched_item_autocomplete)
+
+# Item icons on disk, shared by everything that downloads images. The cache
+# index and eviction assume one owner, so each process keeps its own.
+image_cache = ImageCache(process_path(IMAGE_CACHE_DIR))
+
+# Shop grid images, drawn once per rotation
+shop_images = ShopImageRenderer(get_rarity_color, image_cache, process_path(SHOP_IMAGE_DIR))
+
+# Polls densely around each shop rotation instead of on a fixed interval
+shop_scheduler = RotationScheduler(check_shop_update, shop_cache.peek)
+
+# Leader election and snapshot sharing between processes running different shards
+cluster = Cluster(become_leader, follow_snapshot, sync_watches)
+
+# Counters kept by the components themselves, read only when /metrics is scraped
+registry.callback('shopbot_render_cache_requests_total', 'Render cache lookups by result.', 'counter',
+                  lambda: {('hit',): render_cache.hits, ('miss',): render_cache.misses}, ('result',))
+registry.callback('shopbot_image_cache_requests_total', 'Image cache lookups by result.', 'counter',
+                  lambda: {(key,): value for key, value in image_cache.stats.items()}, ('result',))
+registry.callback('shopbot_image_cache_bytes', 'Bytes of images cached on disk.', 'gauge',
+                  lambda: image_cache.total_bytes)
+registry.callback('shopbot_shop_refresh_failures', 'Consecutive failed shop refreshes.', 'gauge',
+                  lambda: shop_cache.failures)
+registry.callback('shopbot_shop_polls_total', 'Shop polls made by the rotation scheduler.', 'counter',
+                  lambda: shop_scheduler.polls)
+registry.callback('shopbot_update_channels', 'Guilds with a shop update channel.', 'gauge',
+                  lambda: len(channel_registry))
+registry.callback('shopbot_broadcast_guilds_total', 'Guild deliveries of shop updates by result.', 'counter',
+                  lambda: {(key,): value for key, value in broadcaster.totals.items()}, ('result',))
+registry.callback('shopbot_rate_limit_wait_seconds_total', "Time spent waiting on the bot's own send rate limiters.", 'counter',
+                  lambda: {('broadcast',): broadcaster.limiter.waited, ('alerts',): alert_queue.limiter.waited}, ('limiter',))
+registry.callback('shopbot_leader', 'Whether this process polls the shop for all shards.', 'gauge',
+                  lambda: int(cluster.is_leader))
+registry.callback('shopbot_watches', 'Item watch subscriptions.', 'gauge',
+                  lambda: len(watch_list))
+registry.callback('shopbot_shop_breaker_state', 'Fortnite API circuit breaker state per endpoint (0 closed, 1 half-open, 2 open).', 'gauge',
+                  lambda: {(endpoint_name(url),): ('closed', 'half_open', 'open').index(get_breaker(url).state)
+                           for url in endpoints()}, ('endpoint',))
+registry.callback('shopbot_shop_breaker_opened_total', 'Times each Fortnite API circuit breaker opened.', 'counter',
+                  lambda: {(endpoint_name(url),): get_breaker(url).times_opened for url in endpoints()}, ('endpoint',))
+registry.callback('shopbot_shop_fetch_attempts_total', 'Extra Fortnite API requests and skipped fetches by kind.', 'counter',
+                  lambda: {(kind,): fetch_stats[kind] for kind in ('retries', 'hedged', 'short_circuited')}, ('kind',))
+registry.callback('shopbot_commands_rate_limited_total', 'Commands refused by the per-user and per-guild limits.', 'counter',
+                  lambda: {(scope,): value for scope, value in command_limiter.limited.items()}, ('scope',))
+registry.callback('shopbot_command_limiter_buckets', 'Active command rate limit buckets.', 'gauge',
+                  lambda: len(command_limiter))
+registry.callback('shopbot_shop_replies_coalesced_total', '/shop requests answered with a link to one in progress.', 'counter',
+                  lambda: shop_replies.coalesced)
+registry.callback('shopbot_alert_queue_depth', 'Watch alert DMs waiting to be sent.', 'gauge',
+                  lambda: len(alert_queue))
+registry.callback('shopbot_alerts_total', 'Watch alert DMs by result.', 'counter',
+                  lambda: {('sent',): alert_queue.sent, ('failed',): alert_queue.failed}, ('result',))
 
 if __name__ == '__main__':
-    bot.run(TOKEN) 
\ No newline at end of file
+    log_listener = setup_logging()
+    try:
+        # discord.py logs through the same pipeline instead of its own handler
+        bot.run(TOKEN, log_handler=None)
+    finally:
+        log_listener.stop() 
\ No newline at end of file
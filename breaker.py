@@ -0,0 +1,62 @@
+import time
+
+
+class CircuitBreaker:
+    """Stops calling a failing dependency for a while so callers fail fast.
+
+    Closed, calls go through until failure_threshold of them fail in a row.
+    Open, calls are refused until reset_timeout has passed. Half-open, a
+    single trial call is let through: success closes the breaker and
+    failure opens it again. A trial that has not reported back within
+    reset_timeout is given up on and another one is allowed.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    __slots__ = ('failure_threshold', 'reset_timeout', 'state', 'failures', 'opened_at', 'times_opened')
+
+    def __init__(self, failure_threshold, reset_timeout):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.times_opened = 0
+
+    def available(self, now=None):
+        """Whether allow() would let a call through, without reserving the trial call."""
+        if self.state == self.CLOSED:
+            return True
+        now = time.monotonic() if now is None else now
+        # opened_at is when the breaker opened, or when the current trial started
+        return now - self.opened_at >= self.reset_timeout
+
+    def allow(self, now=None):
+        """Whether a call may go ahead; moves an open breaker to half-open when it is due a trial."""
+        now = time.monotonic() if now is None else now
+        if not self.available(now):
+            return False
+        if self.state != self.CLOSED:
+            self.state = self.HALF_OPEN
+            self.opened_at = now
+        return True
+
+    def record_success(self):
+        self.state = self.CLOSED
+        self.failures = 0
+
+    def record_failure(self, now=None):
+        self.failures += 1
+        if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+            if self.state != self.OPEN:
+                self.times_opened += 1
+            self.state = self.OPEN
+            self.opened_at = time.monotonic() if now is None else now
+
+    def abandon(self):
+        """Give up a call without an outcome; a trial call is allowed again straight away."""
+        if self.state == self.HALF_OPEN:
+            self.state = self.OPEN
+            self.opened_at -= self.reset_timeout
@@ -0,0 +1,164 @@
+import asyncio
+import logging
+import os
+import time
+
+import discord
+
+from ratelimit import AsyncRateLimiter
+
+log = logging.getLogger(__name__)
+
+# Broadcast settings (override with environment variables)
+BROADCAST_CONCURRENCY = int(os.getenv('BROADCAST_CONCURRENCY', '20'))
+# Stay under Discord's global limit of 50 requests per second
+BROADCAST_RATE = float(os.getenv('BROADCAST_RATE', '40'))
+
+
+def message_kwargs(message):
+    """Turn a stored message into channel.send kwargs.
+
+    discord.File objects can only be sent once, so messages keep attachment
+    paths under 'file_paths' and fresh files are opened for every send.
+    """
+    if 'file_paths' not in message:
+        return message
+    kwargs = {key: value for key, value in message.items() if key != 'file_paths'}
+    if message['file_paths']:
+        kwargs['files'] = [discord.File(path) for path in message['file_paths']]
+    return kwargs
+
+
+def attachment_rejected(error):
+    """Whether Discord refused a message because its attachments are too large."""
+    return error.status == 413 or error.code == 40005
+
+
+class ChannelRegistry:
+    """Shop update channel for each guild, optionally persisted to a store."""
+
+    def __init__(self, store=None):
+        self.store = store
+        self._channels = {}
+
+    def load(self, channels):
+        """Fill the registry from (guild_id, channel_id) pairs without writing back."""
+        self._channels.update(channels)
+
+    def __len__(self):
+        return len(self._channels)
+
+    def __contains__(self, guild_id):
+        return guild_id in self._channels
+
+    def get(self, guild_id):
+        return self._channels.get(guild_id)
+
+    def set(self, guild_id, channel_id):
+        self._channels[guild_id] = channel_id
+        if self.store is not None:
+            self.store.save_channel(guild_id, channel_id)
+
+    def remove(self, guild_id):
+        if self.store is not None:
+            self.store.delete_channel(guild_id)
+        return self._channels.pop(guild_id, None)
+
+    def items(self):
+        return list(self._channels.items())
+
+
+class BroadcastReport:
+    """Outcome of one broadcast."""
+
+    __slots__ = ('guilds', 'delivered', 'failed', 'removed', 'elapsed', 'rate_limit_wait')
+
+    def __init__(self, guilds):
+        self.guilds = guilds
+        self.delivered = 0
+        self.failed = 0
+        self.removed = 0
+        self.elapsed = 0.0
+        self.rate_limit_wait = 0.0
+
+    def __str__(self):
+        return (f'{self.delivered}/{self.guilds} guilds in {self.elapsed:.2f}s '
+                f'({self.failed} failed, {self.removed} removed, '
+                f'{self.rate_limit_wait:.2f}s waiting on rate limits)')
+
+
+class Broadcaster:
+    """Fans one set of pre-rendered messages out to every registered channel.
+
+    Guilds are sent to concurrently, up to a fixed number at a time, while
+    messages within a channel stay in order. Every send first takes a token
+    from a shared limiter so the bot stays below Discord's global rate
+    limit; per-channel route buckets are handled by discord.py itself.
+    """
+
+    def __init__(self, client, registry, concurrency=BROADCAST_CONCURRENCY, rate=BROADCAST_RATE):
+        self.client = client
+        self.registry = registry
+        self.concurrency = concurrency
+        self.limiter = AsyncRateLimiter(rate)
+        self.last_report = None
+        # Running totals across broadcasts, for metrics
+        self.totals = {'delivered': 0, 'failed': 0, 'removed': 0}
+
+    async def _send_to_guild(self, semaphore, guild_id, channel_id, messages, report):
+        async with semaphore:
+            channel = self.client.get_channel(channel_id)
+            if channel is None:
+                report.failed += 1
+                return
+            try:
+                for message in messages:
+                    await self.limiter.acquire()
+                    try:
+                        await channel.send(**message_kwargs(message))
+                    except discord.HTTPException as e:
+                        if not (message.get('file_paths') and attachment_rejected(e)):
+                            raise
+                        # Images are sent last, so the text is already out
+                        log.warning('Shop images too large for guild %s: %s', guild_id, e, extra={'guild_id': guild_id})
+                        break
+                report.delivered += 1
+            except discord.NotFound as e:
+                # The channel was deleted: stop sending to it
+                log.warning('Removing shop channel for guild %s: %s', guild_id, e, extra={'guild_id': guild_id})
+                self.registry.remove(guild_id)
+                report.failed += 1
+                report.removed += 1
+            except discord.HTTPException as e:
+                log.warning('Error sending shop update to guild %s: %s', guild_id, e, extra={'guild_id': guild_id})
+                report.failed += 1
+
+    async def broadcast(self, messages, owns_guild=None):
+        """Send messages (a list of channel.send kwargs) to every registered channel.
+
+        owns_guild(guild_id) limits the broadcast to guilds this process serves.
+        """
+        targets = self.registry.items()
+        if owns_guild is not None:
+            targets = [(guild_id, channel_id) for guild_id, channel_id in targets if owns_guild(guild_id)]
+        report = BroadcastReport(len(targets))
+        semaphore = asyncio.Semaphore(self.concurrency)
+        waited_before = self.limiter.waited
+        started = time.monotonic()
+
+        await asyncio.gather(*(
+            self._send_to_guild(semaphore, guild_id, channel_id, messages, report)
+            for guild_id, channel_id in targets
+        ))
+
+        report.elapsed = time.monotonic() - started
+        report.rate_limit_wait = self.limiter.waited - waited_before
+        self.last_report = report
+        self.totals['delivered'] += report.delivered
+        self.totals['failed'] += report.failed
+        self.totals['removed'] += report.removed
+        log.info('Shop broadcast: %s', report, extra={
+            'guilds': report.guilds, 'delivered': report.delivered, 'failed': report.failed,
+            'latency_ms': round(report.elapsed * 1000, 1)
+        })
+        return report
@@ -0,0 +1,282 @@
+import asyncio
+import logging
+import marshal
+import mmap
+import os
+import struct
+
+from shop_model import ShopSnapshot
+
+try:
+    import fcntl
+except ImportError:
+    # No flock (Windows): every process acts as the leader
+    fcntl = None
+
+log = logging.getLogger(__name__)
+
+
+def parse_shard_ids(value):
+    """Parse "0-3,8" into [0, 1, 2, 3, 8]."""
+    shard_ids = []
+    for part in value.split(','):
+        part = part.strip()
+        if not part:
+            continue
+        start, _, end = part.partition('-')
+        shard_ids.extend(range(int(start), int(end or start) + 1))
+    return sorted(set(shard_ids))
+
+
+# Sharding (override with environment variables)
+# SHARDED=1 runs every shard in this process with AutoShardedBot.
+# SHARD_IDS/SHARD_COUNT run only some shards here, with other processes
+# running the rest; one of them is elected to poll the shop for all.
+SHARD_IDS = parse_shard_ids(os.getenv('SHARD_IDS', ''))
+SHARD_COUNT = int(os.getenv('SHARD_COUNT', '0')) or None
+SHARDED = os.getenv('SHARDED', '').lower() in ('1', 'true', 'yes') or bool(SHARD_IDS) or bool(SHARD_COUNT)
+MULTI_PROCESS = bool(SHARD_IDS)
+
+if SHARD_IDS and not SHARD_COUNT:
+    raise RuntimeError('SHARD_IDS needs SHARD_COUNT, the total number of shards across all processes')
+if SHARD_IDS and SHARD_IDS[-1] >= SHARD_COUNT:
+    raise RuntimeError(f'SHARD_IDS goes up to {SHARD_IDS[-1]}, but SHARD_COUNT is {SHARD_COUNT}')
+
+LEADER_LOCK_PATH = os.getenv('LEADER_LOCK_PATH', 'shopbot.leader.lock')
+SHARED_SNAPSHOT_PATH = os.getenv('SHARED_SNAPSHOT_PATH', 'shopbot.snapshot')
+# How often followers look for a new snapshot and try to take over leadership
+CLUSTER_INTERVAL = float(os.getenv('CLUSTER_INTERVAL', '5'))
+
+# Shared snapshot control file: magic, marshal format version, generation
+CONTROL = struct.Struct('<4sIQ')
+CONTROL_MAGIC = b'SHOP'
+
+
+def shard_for_guild(guild_id, shard_count):
+    """The shard Discord routes a guild to."""
+    return (guild_id >> 22) % shard_count
+
+
+def shard_scope():
+    """Identifies this process's shards in shared state, or '' when unsharded."""
+    return ','.join(map(str, SHARD_IDS))
+
+
+def process_path(path):
+    """Give each process of a multi-process cluster its own copy of a directory it manages alone."""
+    if not MULTI_PROCESS:
+        return path
+    return f"{path}-shards-{shard_scope().replace(',', '_')}"
+
+
+def bot_options():
+    """Keyword arguments selecting the shards this process connects."""
+    if not SHARDED:
+        return {}
+    options = {}
+    if SHARD_IDS:
+        options['shard_ids'] = SHARD_IDS
+    if SHARD_COUNT:
+        options['shard_count'] = SHARD_COUNT
+    return options
+
+
+class LeaderLock:
+    """An exclusive flock on a local file; whoever holds it is the leader.
+
+    The OS drops the lock when the holder exits, so another process can
+    take over on its next attempt.
+    """
+
+    def __init__(self, path=LEADER_LOCK_PATH):
+        self.path = path
+        self._file = None
+
+    @property
+    def held(self):
+        return self._file is not None
+
+    def try_acquire(self):
+        if self._file is not None:
+            return True
+        if fcntl is None:
+            self._file = True
+            return True
+        f = open(self.path, 'a+')
+        try:
+            fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            f.close()
+            return False
+        self._file = f
+        return True
+
+    def release(self):
+        if self._file is not None and self._file is not True:
+            fcntl.flock(self._file, fcntl.LOCK_UN)
+            self._file.close()
+        self._file = None
+
+
+class SnapshotExchange:
+    """Shares the leader's latest snapshot with other processes through memory-mapped files.
+
+    Each snapshot is marshalled with its prebuilt indexes into its own
+    data file, path.<generation>. A small control file at path, mapped by
+    every process, holds the current generation: followers notice a new
+    snapshot by reading it from shared memory, then decode the data file
+    straight from its mapping, without parsing JSON or rebuilding indexes.
+    marshal's format is tied to the Python version, so every process must
+    run the same one.
+    """
+
+    def __init__(self, path=SHARED_SNAPSHOT_PATH):
+        self.path = path
+        self.generation = 0
+        self._published = None
+        self._control = None
+
+    def _map_control(self):
+        if self._control is None:
+            with open(self.path, 'a+b') as f:
+                if os.fstat(f.fileno()).st_size < CONTROL.size:
+                    f.truncate(CONTROL.size)
+                self._control = mmap.mmap(f.fileno(), CONTROL.size)
+        return self._control
+
+    def _data_path(self, generation):
+        return f'{self.path}.{generation}'
+
+    def current_generation(self):
+        magic, version, generation = CONTROL.unpack_from(self._map_control())
+        if magic != CONTROL_MAGIC or version != marshal.version:
+            return 0
+        return generation
+
+    def publish(self, snapshot):
+        if snapshot.content_hash == self._published:
+            return
+        # Continue from the shared counter, which may have been advanced by an earlier leader
+        generation = self.current_generation() + 1
+        path = self._data_path(generation)
+        with open(path + '.tmp', 'wb') as f:
+            f.write(marshal.dumps(snapshot.to_shared_record()))
+        os.replace(path + '.tmp', path)
+        # The data file is complete before the generation points at it. After the
+        # first publish only the aligned 8 byte generation changes.
+        CONTROL.pack_into(self._map_control(), 0, CONTROL_MAGIC, marshal.version, generation)
+        self.generation = generation
+        self._published = snapshot.content_hash
+        self._remove_old(generation)
+
+    def _remove_old(self, generation):
+        # The previous generation is kept for followers still switching from it
+        directory = os.path.dirname(self.path) or '.'
+        prefix = os.path.basename(self.path) + '.'
+        for name in os.listdir(directory):
+            suffix = name[len(prefix):]
+            if name.startswith(prefix) and suffix.isdigit() and int(suffix) < generation - 1:
+                try:
+                    os.remove(os.path.join(directory, name))
+                except OSError:
+                    pass
+
+    def read_if_changed(self):
+        """Return the shared snapshot if a new generation was published since the last read, else None."""
+        generation = self.current_generation()
+        if generation == self.generation:
+            return None
+        try:
+            with open(self._data_path(generation), 'rb') as f:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                    record = marshal.loads(data)
+            snapshot = ShopSnapshot.from_shared_record(record)
+        except FileNotFoundError:
+            # Superseded while switching; the newer generation is read next time
+            return None
+        except (OSError, ValueError, EOFError, KeyError, TypeError, IndexError) as e:
+            log.warning('Ignoring unreadable shared snapshot %s: %s', generation, e)
+            self.generation = generation
+            return None
+        self.generation = generation
+        return snapshot
+
+    def close(self):
+        if self._control is not None:
+            self._control.close()
+            self._control = None
+
+
+class Cluster:
+    """Decides which process polls the shop and feeds the others its snapshots.
+
+    In a single process this process is simply the leader. With SHARD_IDS
+    set, processes compete for the leader lock: the leader polls the API
+    and publishes each snapshot, and followers pick them up from the
+    exchange and try to take over if the leader goes away. on_tick runs
+    on every process each interval, to pick up state other processes
+    changed.
+    """
+
+    def __init__(self, on_elected, on_snapshot, on_tick=None, multi_process=MULTI_PROCESS,
+                 lock=None, exchange=None, interval=CLUSTER_INTERVAL, shard_ids=SHARD_IDS, shard_count=SHARD_COUNT):
+        self.on_elected = on_elected
+        self.on_snapshot = on_snapshot
+        self.on_tick = on_tick
+        self.multi_process = multi_process
+        self.lock = lock or LeaderLock()
+        self.exchange = exchange or SnapshotExchange()
+        self.interval = interval
+        self.shard_ids = set(shard_ids)
+        self.shard_count = shard_count
+        self.is_leader = not multi_process
+        self._task = None
+
+    def owns_guild(self, guild_id):
+        """Whether this process is connected to the shard serving a guild."""
+        if not self.multi_process:
+            return True
+        return shard_for_guild(guild_id, self.shard_count) in self.shard_ids
+
+    def publish(self, snapshot):
+        if self.multi_process and self.is_leader:
+            try:
+                self.exchange.publish(snapshot)
+            except OSError as e:
+                log.error('Error sharing shop snapshot: %s', e)
+
+    async def _elect(self):
+        if not self.is_leader and self.lock.try_acquire():
+            self.is_leader = True
+            log.info('This process is now the shop polling leader')
+            await self.on_elected()
+
+    async def run(self):
+        while True:
+            try:
+                await self._elect()
+                if not self.is_leader:
+                    snapshot = self.exchange.read_if_changed()
+                    if snapshot is not None:
+                        await self.on_snapshot(snapshot)
+                if self.on_tick is not None:
+                    await self.on_tick()
+            except Exception:
+                log.exception('Error in cluster loop')
+            await asyncio.sleep(self.interval)
+
+    async def start(self):
+        """Become the leader right away if possible, then keep following/electing."""
+        if not self.multi_process:
+            await self.on_elected()
+            return
+        await self._elect()
+        if self._task is None or self._task.done():
+            self._task = asyncio.ensure_future(self.run())
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        self.lock.release()
+        self.exchange.close()
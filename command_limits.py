@@ -0,0 +1,99 @@
+import asyncio
+import os
+import time
+
+from ratelimit import KeyedRateLimiter
+
+# Command rate limits (override with environment variables)
+# Each user and each guild gets its own budget per command: RATE tokens
+# per second, up to BURST at once.
+USER_COMMAND_RATE = float(os.getenv('USER_COMMAND_RATE', '0.2'))
+USER_COMMAND_BURST = int(os.getenv('USER_COMMAND_BURST', '3'))
+GUILD_COMMAND_RATE = float(os.getenv('GUILD_COMMAND_RATE', '1'))
+GUILD_COMMAND_BURST = int(os.getenv('GUILD_COMMAND_BURST', '10'))
+
+
+class CommandLimiter:
+    """Token buckets per (user, command) and (guild, command).
+
+    A command is only charged to the user and the guild when both have a
+    token, so being held back by the guild's budget does not also use up
+    the user's.
+    """
+
+    def __init__(self, user_rate=USER_COMMAND_RATE, user_burst=USER_COMMAND_BURST,
+                 guild_rate=GUILD_COMMAND_RATE, guild_burst=GUILD_COMMAND_BURST):
+        self.users = KeyedRateLimiter(user_rate, user_burst)
+        self.guilds = KeyedRateLimiter(guild_rate, guild_burst)
+        self.limited = {'user': 0, 'guild': 0}
+
+    def __len__(self):
+        return len(self.users) + len(self.guilds)
+
+    def check(self, command, user_id, guild_id=None, now=None):
+        """Charge one use of a command; returns 0.0, or the seconds to wait if over a limit."""
+        now = time.monotonic() if now is None else now
+        user_key = (user_id, command)
+        guild_key = (guild_id, command)
+
+        wait = self.users.wait_time(user_key, now)
+        if wait:
+            self.limited['user'] += 1
+            return wait
+        if guild_id is not None:
+            wait = self.guilds.wait_time(guild_key, now)
+            if wait:
+                self.limited['guild'] += 1
+                return wait
+            self.guilds.try_acquire(guild_key, now)
+        self.users.try_acquire(user_key, now)
+        return 0.0
+
+
+class InFlightReplies:
+    """The reply each in-progress command will send, per key (e.g. a channel).
+
+    A repeat of a command that is still being answered waits for the first
+    one's message and links to it instead of rendering and sending its own.
+    """
+
+    def __init__(self):
+        self.coalesced = 0
+        self._replies = {}
+
+    def __len__(self):
+        return len(self._replies)
+
+    def pending(self, key):
+        """Return an awaitable for the message being sent for key (None if sending fails), or None."""
+        reply = self._replies.get(key)
+        if reply is None:
+            return None
+        self.coalesced += 1
+        # Shielded so a waiter that is cancelled does not cancel the others
+        return asyncio.shield(reply)
+
+    def answer(self, key):
+        """Context manager for answering key; call its set(message) once the reply is sent."""
+        return _Reply(self, key)
+
+
+class _Reply:
+    def __init__(self, replies, key):
+        self.replies = replies
+        self.key = key
+        self.future = None
+
+    def set(self, message):
+        if not self.future.done():
+            self.future.set_result(message)
+
+    async def __aenter__(self):
+        self.future = asyncio.get_running_loop().create_future()
+        self.replies._replies[self.key] = self.future
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.set(None)
+        if self.replies._replies.get(self.key) is self.future:
+            del self.replies._replies[self.key]
@@ -1,15 +1,42 @@
+// Set SHARD_COUNT and SHARD_PROCESSES to split the shards across processes
+const shardCount = parseInt(process.env.SHARD_COUNT || '0', 10);
+const shardProcesses = parseInt(process.env.SHARD_PROCESSES || '1', 10);
+// Each process serves /metrics on its own port, counting up from this one
+const metricsPort = parseInt(process.env.METRICS_PORT || '9108', 10);
+
+const base = {
+  name: 'fortnite-shop-bot',
+  script: 'python3',
+  args: 'bot.py',
+  cwd: '/Users/conor/Documents/Discord Bot Fn item shop',
+  watch: false,
+  instances: 1,
+  autorestart: true,
+  max_memory_restart: '1G',
+  env: {
+    NODE_ENV: 'production'
+  }
+};
+
+function shardApps() {
+  const perProcess = Math.ceil(shardCount / shardProcesses);
+  const apps = [];
+  for (let first = 0; first < shardCount; first += perProcess) {
+    const last = Math.min(first + perProcess, shardCount) - 1;
+    apps.push({
+      ...base,
+      name: `${base.name}-${apps.length}`,
+      env: {
+        ...base.env,
+        SHARD_COUNT: String(shardCount),
+        SHARD_IDS: `${first}-${last}`,
+        METRICS_PORT: metricsPort ? String(metricsPort + apps.length) : '0'
+      }
+    });
+  }
+  return apps;
+}
+
 module.exports = {
-  apps: [{
-    name: 'fortnite-shop-bot',
-    script: 'python3',
-    args: 'bot.py',
-    cwd: '/Users/conor/Documents/Discord Bot Fn item shop',
-    watch: false,
-    instances: 1,
-    autorestart: true,
-    max_memory_restart: '1G',
-    env: {
-      NODE_ENV: 'production'
-    }
-  }]
-} 
\ No newline at end of file
+  apps: shardCount > 0 && shardProcesses > 1 ? shardApps() : [base]
+};
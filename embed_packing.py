@@ -0,0 +1,81 @@
+# Discord embed and message limits
+# https://discord.com/developers/docs/resources/message#embed-object-embed-limits
+MAX_TITLE = 256
+MAX_DESCRIPTION = 4096
+MAX_FIELDS = 25
+MAX_FIELD_NAME = 256
+MAX_FIELD_VALUE = 1024
+MAX_FOOTER = 2048
+MAX_EMBED_CHARS = 6000
+MAX_EMBEDS_PER_MESSAGE = 10
+# The 6000 character limit applies to all embeds in a message together
+MAX_MESSAGE_CHARS = 6000
+
+# Room left in each embed for the page footer, which is set after packing
+FOOTER_RESERVE = 64
+# Keep single embeds well below the message budget so several fit in one message
+EMBED_BUDGET = 3000
+
+
+def clamp(text, limit):
+    """Shorten text to fit a Discord limit."""
+    text = str(text)
+    if len(text) <= limit:
+        return text
+    return text[:limit - 1] + '…'
+
+
+def validate_embed(embed):
+    """Raise ValueError if an embed breaks any Discord limit."""
+    if embed.title and len(embed.title) > MAX_TITLE:
+        raise ValueError(f'Embed title is {len(embed.title)} characters')
+    if embed.description and len(embed.description) > MAX_DESCRIPTION:
+        raise ValueError(f'Embed description is {len(embed.description)} characters')
+    if len(embed.fields) > MAX_FIELDS:
+        raise ValueError(f'Embed has {len(embed.fields)} fields')
+    for field in embed.fields:
+        if len(field.name) > MAX_FIELD_NAME or len(field.value) > MAX_FIELD_VALUE:
+            raise ValueError(f'Embed field "{field.name[:32]}" is too long')
+    if embed.footer.text and len(embed.footer.text) > MAX_FOOTER:
+        raise ValueError('Embed footer is too long')
+    if len(embed) > MAX_EMBED_CHARS:
+        raise ValueError(f'Embed is {len(embed)} characters')
+
+
+def pack_fields(fields, new_embed, budget=EMBED_BUDGET):
+    """Fill embeds with (name, value, inline) fields up to the Discord limits.
+
+    new_embed(index) returns an empty embed (title, description, ...) for
+    the page at that index. Field text is clamped to the field limits.
+    """
+    embeds = []
+    current = None
+    for name, value, inline in fields:
+        name = clamp(name, MAX_FIELD_NAME)
+        value = clamp(value, MAX_FIELD_VALUE)
+        size = len(name) + len(value)
+        if (current is None or len(current.fields) >= MAX_FIELDS
+                or len(current) + size + FOOTER_RESERVE > budget):
+            current = new_embed(len(embeds))
+            embeds.append(current)
+        current.add_field(name=name, value=value, inline=inline)
+    return embeds
+
+
+def group_embeds(embeds, max_embeds=MAX_EMBEDS_PER_MESSAGE, max_chars=MAX_MESSAGE_CHARS):
+    """Group embeds into as few messages as the per-message limits allow."""
+    messages = []
+    current = []
+    current_chars = 0
+    for embed in embeds:
+        validate_embed(embed)
+        size = len(embed)
+        if current and (len(current) >= max_embeds or current_chars + size > max_chars):
+            messages.append(current)
+            current = []
+            current_chars = 0
+        current.append(embed)
+        current_chars += size
+    if current:
+        messages.append(current)
+    return messages
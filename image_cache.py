@@ -0,0 +1,239 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import aiohttp
+
+from shop_api import get_session
+
+log = logging.getLogger(__name__)
+
+# Image cache settings (override with environment variables)
+IMAGE_CACHE_DIR = os.getenv('IMAGE_CACHE_DIR', os.path.join('image_cache', 'blobs'))
+IMAGE_CACHE_BYTES = int(os.getenv('IMAGE_CACHE_BYTES', str(256 * 1024 * 1024)))
+# Cached images older than this are revalidated with the server before use
+IMAGE_CACHE_MAX_AGE = float(os.getenv('IMAGE_CACHE_MAX_AGE', '86400'))
+IMAGE_FETCH_CONCURRENCY = int(os.getenv('IMAGE_FETCH_CONCURRENCY', '8'))
+
+INDEX_FILE = 'index.json'
+
+
+class CachedImage:
+    """What the cache knows about one URL."""
+
+    __slots__ = ('digest', 'size', 'etag', 'last_modified', 'checked')
+
+    def __init__(self, digest, size, etag=None, last_modified=None, checked=0.0):
+        self.digest = digest
+        self.size = size
+        self.etag = etag
+        self.last_modified = last_modified
+        self.checked = checked
+
+    def to_record(self):
+        return [self.digest, self.size, self.etag, self.last_modified, self.checked]
+
+    @classmethod
+    def from_record(cls, record):
+        return cls(*record)
+
+
+class ImageCache:
+    """Content-addressed disk cache for item images, keyed by URL.
+
+    Image bytes are stored once per SHA-256 digest, so URLs serving the
+    same picture share a file. Entries older than max_age are revalidated
+    with If-None-Match/If-Modified-Since before use, and the least
+    recently used images are evicted once the cache exceeds its byte
+    budget. The URL index is kept in a small JSON file next to the blobs.
+
+    All file work runs on one background thread; the index itself is
+    only changed on the event loop.
+    """
+
+    def __init__(self, directory=IMAGE_CACHE_DIR, max_bytes=IMAGE_CACHE_BYTES, max_age=IMAGE_CACHE_MAX_AGE):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.stats = {'hits': 0, 'misses': 0, 'revalidated': 0, 'evictions': 0}
+        self.total_bytes = 0
+        self._entries = OrderedDict()
+        self._urls_by_digest = {}
+        self._loaded = False
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='image-cache')
+
+    async def _run(self, func, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, func, *args)
+
+    def _blob_path(self, digest):
+        return os.path.join(self.directory, digest[:2], digest)
+
+    def _link(self, url, entry):
+        urls = self._urls_by_digest.setdefault(entry.digest, set())
+        if not urls:
+            self.total_bytes += entry.size
+        urls.add(url)
+        self._entries[url] = entry
+
+    def _unlink(self, url):
+        """Forget a URL; returns its blob path if no other URL shares it, for deletion."""
+        entry = self._entries.pop(url)
+        urls = self._urls_by_digest[entry.digest]
+        urls.discard(url)
+        if urls:
+            return None
+        del self._urls_by_digest[entry.digest]
+        self.total_bytes -= entry.size
+        return self._blob_path(entry.digest)
+
+    def _remove_blobs(self, paths):
+        for path in paths:
+            # Skip blobs that a URL stored since has linked again
+            if os.path.basename(path) in self._urls_by_digest:
+                continue
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def _read_index(self):
+        """Return the stored (url, record) pairs whose blob still exists."""
+        try:
+            with open(os.path.join(self.directory, INDEX_FILE), encoding='utf-8') as f:
+                records = json.load(f)
+        except FileNotFoundError:
+            return []
+        except (OSError, ValueError) as e:
+            log.warning('Ignoring unreadable image cache index: %s', e)
+            return []
+        return [(url, record) for url, record in records
+                if os.path.exists(self._blob_path(CachedImage.from_record(record).digest))]
+
+    async def load(self):
+        """Read the URL index, dropping entries whose blob is gone."""
+        self._loaded = True
+        # Stored least recently used first
+        for url, record in await self._run(self._read_index):
+            if url not in self._entries:
+                self._link(url, CachedImage.from_record(record))
+
+    def _write_index(self, records):
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, INDEX_FILE)
+        with open(path + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump(records, f)
+        os.replace(path + '.tmp', path)
+
+    async def save(self):
+        records = [[url, entry.to_record()] for url, entry in self._entries.items()]
+        await self._run(self._write_index, records)
+
+    def _evict(self):
+        """Drop least recently used URLs until within budget; returns blob paths to delete."""
+        removed = []
+        # Always keep the most recent image, even if it alone is over budget
+        while self.total_bytes > self.max_bytes and len(self._entries) > 1:
+            path = self._unlink(next(iter(self._entries)))
+            if path is not None:
+                removed.append(path)
+            self.stats['evictions'] += 1
+        return removed
+
+    def _write_blob(self, data):
+        digest = hashlib.sha256(data).hexdigest()
+        path = self._blob_path(digest)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path + '.tmp', 'wb') as f:
+                f.write(data)
+            os.replace(path + '.tmp', path)
+        return digest
+
+    async def _store(self, url, data, etag, last_modified):
+        digest = await self._run(self._write_blob, data)
+        removed = []
+        if url in self._entries:
+            path = self._unlink(url)
+            if path is not None and path != self._blob_path(digest):
+                removed.append(path)
+        self._link(url, CachedImage(digest, len(data), etag, last_modified, time.time()))
+        removed.extend(self._evict())
+        if removed:
+            await self._run(self._remove_blobs, removed)
+        return self._blob_path(digest)
+
+    def path(self, url):
+        """Return the local file for a cached URL without touching the network."""
+        entry = self._entries.get(url)
+        return self._blob_path(entry.digest) if entry else None
+
+    async def fetch(self, url, session=None):
+        """Return a local path for url, downloading or revalidating it if needed."""
+        if not self._loaded:
+            await self.load()
+        entry = self._entries.get(url)
+        if entry is not None and time.time() - entry.checked < self.max_age:
+            self.stats['hits'] += 1
+            self._entries.move_to_end(url)
+            return self._blob_path(entry.digest)
+
+        headers = {}
+        if entry is not None:
+            if entry.etag:
+                headers['If-None-Match'] = entry.etag
+            if entry.last_modified:
+                headers['If-Modified-Since'] = entry.last_modified
+
+        session = session or await get_session()
+        try:
+            async with session.get(url, headers=headers) as response:
+                if response.status == 304 and entry is not None:
+                    self.stats['hits'] += 1
+                    self.stats['revalidated'] += 1
+                    entry.checked = time.time()
+                    self._entries.move_to_end(url)
+                    return self._blob_path(entry.digest)
+                if response.status != 200:
+                    log.warning('Error downloading image %s: HTTP %s', url, response.status)
+                    return self.path(url)
+                data = await response.read()
+                etag = response.headers.get('ETag')
+                last_modified = response.headers.get('Last-Modified')
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            # Serve a stale copy rather than nothing
+            log.warning('Error downloading image %s: %r', url, e)
+            return self.path(url)
+
+        self.stats['misses'] += 1
+        return await self._store(url, data, etag, last_modified)
+
+    async def fetch_many(self, urls, concurrency=IMAGE_FETCH_CONCURRENCY):
+        """Return a local path (or None) for each URL, fetching them concurrently."""
+        if not self._loaded:
+            await self.load()
+        session = await get_session()
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def fetch(url):
+            if not url:
+                return None
+            async with semaphore:
+                return await self.fetch(url, session)
+
+        # Repeated URLs (e.g. bundle contents) are only fetched once
+        unique = list(dict.fromkeys(urls))
+        paths = dict(zip(unique, await asyncio.gather(*(fetch(url) for url in unique))))
+        try:
+            await self.save()
+        except OSError as e:
+            log.warning('Error saving image cache index: %s', e)
+        return [paths[url] for url in urls]
+
+    def close(self):
+        self._executor.shutdown(wait=True)
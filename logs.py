@@ -0,0 +1,139 @@
+import copy
+import json
+import logging
+import os
+import queue
+import random
+import sys
+import traceback
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+
+# Logging settings (override with environment variables)
+LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO').upper()
+# 'json' for one JSON object per line, 'text' for reading logs by eye
+LOG_FORMAT = os.getenv('LOG_FORMAT', 'json')
+# Fraction of INFO/DEBUG records kept per logger, e.g. "shopbot.commands=0.1,discord.gateway=0.5"
+LOG_SAMPLE_RATES = os.getenv('LOG_SAMPLE_RATES', '')
+
+# Fields describing the interaction being handled, set per asyncio task
+log_context = ContextVar('log_context', default={})
+
+_RECORD_FIELDS = set(logging.LogRecord('', 0, '', 0, '', (), None).__dict__) | {'message', 'asctime', 'taskName'}
+
+
+def bind(**fields):
+    """Attach fields to every record logged from the current task (and tasks it starts)."""
+    log_context.set({**log_context.get(), **fields})
+
+
+def parse_sample_rates(value):
+    rates = {}
+    for part in value.split(','):
+        name, _, rate = part.partition('=')
+        if name.strip() and rate.strip():
+            rates[name.strip()] = float(rate)
+    return rates
+
+
+class SamplingFilter(logging.Filter):
+    """Keeps a fraction of the INFO and DEBUG records from busy loggers.
+
+    Warnings and errors are always kept. A rate set for "shopbot" also
+    applies to "shopbot.commands" unless that has its own rate.
+    """
+
+    def __init__(self, rates):
+        super().__init__()
+        self.rates = rates
+        self._cache = {}
+
+    def _rate(self, name):
+        rate = self._cache.get(name)
+        if rate is None:
+            rate = 1.0
+            prefix = name
+            while prefix:
+                if prefix in self.rates:
+                    rate = self.rates[prefix]
+                    break
+                prefix = prefix.rpartition('.')[0]
+            self._cache[name] = rate
+        return rate
+
+    def filter(self, record):
+        if record.levelno >= logging.WARNING or not self.rates:
+            return True
+        rate = self._rate(record.name)
+        return rate >= 1.0 or random.random() < rate
+
+
+class ContextQueueHandler(QueueHandler):
+    """Hands records to the writer thread with the caller's context attached.
+
+    Messages are formatted on the writer thread, so log arguments should be
+    values that are not modified afterwards. Tracebacks are rendered here,
+    while the exception is still current.
+    """
+
+    def prepare(self, record):
+        record = copy.copy(record)
+        for key, value in log_context.get().items():
+            if not hasattr(record, key):
+                setattr(record, key, value)
+        if record.exc_info:
+            record.exc_text = ''.join(traceback.format_exception(*record.exc_info)).rstrip()
+            record.exc_info = None
+        return record
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record, with context and extra fields at the top level."""
+
+    def format(self, record):
+        entry = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_FIELDS:
+                entry[key] = value
+        if record.exc_text:
+            entry['exception'] = record.exc_text
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class TextFormatter(logging.Formatter):
+    def __init__(self):
+        super().__init__('%(asctime)s %(levelname)s %(name)s: %(message)s')
+
+    def format(self, record):
+        text = super().format(record)
+        fields = ' '.join(f'{key}={value}' for key, value in record.__dict__.items() if key not in _RECORD_FIELDS)
+        return f'{text} [{fields}]' if fields else text
+
+
+def setup_logging(level=LOG_LEVEL, log_format=LOG_FORMAT, sample_rates=LOG_SAMPLE_RATES, stream=None):
+    """Route all logging through a queue to a background writer thread.
+
+    Returns the QueueListener; stop() it on shutdown to flush what is queued.
+    """
+    writer = logging.StreamHandler(stream or sys.stdout)
+    writer.setFormatter(JsonFormatter() if log_format == 'json' else TextFormatter())
+
+    records = queue.SimpleQueue()
+    handler = ContextQueueHandler(records)
+    handler.addFilter(SamplingFilter(parse_sample_rates(sample_rates)))
+
+    root = logging.getLogger()
+    for existing in list(root.handlers):
+        root.removeHandler(existing)
+    root.addHandler(handler)
+    root.setLevel(level)
+
+    listener = QueueListener(records, writer, respect_handler_level=True)
+    listener.start()
+    return listener
@@ -0,0 +1,255 @@
+import asyncio
+import bisect
+import logging
+import os
+import time
+
+# Metrics endpoint (override with environment variables); port 0 turns it off
+METRICS_HOST = os.getenv('METRICS_HOST', '127.0.0.1')
+METRICS_PORT = int(os.getenv('METRICS_PORT', '9108'))
+# How often the event loop lag probe wakes up
+LOOP_LAG_INTERVAL = float(os.getenv('LOOP_LAG_INTERVAL', '0.5'))
+
+log = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _labels(names, values, extra=''):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+class Metric:
+    """Base for metrics held in process memory and rendered on scrape."""
+
+    type = 'untyped'
+
+    def __init__(self, name, help, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+
+    def header(self):
+        return [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} {self.type}']
+
+    def samples(self):
+        for values, value in self._values.items():
+            yield f'{self.name}{_labels(self.labelnames, values)} {value}'
+
+    def render(self):
+        return self.header() + list(self.samples())
+
+
+class Counter(Metric):
+    type = 'counter'
+
+    def inc(self, *labels, amount=1):
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+
+class Gauge(Metric):
+    type = 'gauge'
+
+    def set(self, value, *labels):
+        self._values[labels] = value
+
+
+class Histogram(Metric):
+    type = 'histogram'
+
+    def __init__(self, name, help, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, *labels):
+        state = self._values.get(labels)
+        if state is None:
+            # Per-bucket counts (cumulated when rendered), then sum and count
+            state = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        state[0][bisect.bisect_left(self.buckets, value)] += 1
+        state[1] += value
+        state[2] += 1
+
+    def time(self, *labels):
+        return _Timer(self, labels)
+
+    def samples(self):
+        for values, (counts, total, count) in self._values.items():
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + ('+Inf',), counts):
+                cumulative += bucket_count
+                le = f'le="{bound}"'
+                yield f'{self.name}_bucket{_labels(self.labelnames, values, le)} {cumulative}'
+            yield f'{self.name}_sum{_labels(self.labelnames, values)} {total}'
+            yield f'{self.name}_count{_labels(self.labelnames, values)} {count}'
+
+
+class _Timer:
+    __slots__ = ('histogram', 'labels', 'started')
+
+    def __init__(self, histogram, labels):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.started, *self.labels)
+
+
+class CallbackMetric(Metric):
+    """Reads its value(s) from the owning object only when scraped.
+
+    func returns a number, or a dict of label value tuples to numbers.
+    Counters already kept by other modules are exposed this way at no cost
+    to the code that updates them.
+    """
+
+    def __init__(self, name, help, type, func, labelnames=()):
+        super().__init__(name, help, labelnames)
+        self.type = type
+        self.func = func
+
+    def samples(self):
+        value = self.func()
+        if not isinstance(value, dict):
+            value = {(): value}
+        for values, number in value.items():
+            yield f'{self.name}{_labels(self.labelnames, values)} {number}'
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def counter(self, name, help, labelnames=()):
+        return self.register(Counter(name, help, labelnames))
+
+    def gauge(self, name, help, labelnames=()):
+        return self.register(Gauge(name, help, labelnames))
+
+    def histogram(self, name, help, labelnames=(), buckets=LATENCY_BUCKETS):
+        return self.register(Histogram(name, help, labelnames, buckets))
+
+    def callback(self, name, help, type, func, labelnames=()):
+        return self.register(CallbackMetric(name, help, type, func, labelnames))
+
+    def render(self):
+        """Return every metric in the Prometheus text exposition format."""
+        lines = []
+        for metric in self.metrics:
+            try:
+                lines.extend(metric.render())
+            except Exception:
+                log.exception('Error rendering metric %s', metric.name)
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+
+# Metrics shared by several modules
+shop_fetch_seconds = registry.histogram(
+    'shopbot_shop_fetch_seconds', 'Time taken by Fortnite API shop requests.', ('endpoint',))
+shop_fetch_responses = registry.counter(
+    'shopbot_shop_fetch_responses_total', 'Fortnite API shop responses by status.', ('endpoint', 'status'))
+shop_cache_requests = registry.counter(
+    'shopbot_shop_cache_requests_total', 'Shop cache lookups by result.', ('result',))
+command_seconds = registry.histogram(
+    'shopbot_command_seconds', 'Slash command latency from interaction creation to completion.', ('command',))
+command_errors = registry.counter(
+    'shopbot_command_errors_total', 'Slash commands that raised an error.', ('command',))
+render_seconds = registry.histogram(
+    'shopbot_render_seconds', 'Time spent rendering command replies on render cache misses.', ('command',))
+update_seconds = registry.histogram(
+    'shopbot_update_seconds', 'Duration of check_shop_update.', ('outcome',),
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120))
+loop_lag_seconds = registry.histogram(
+    'shopbot_event_loop_lag_seconds', 'How late the event loop ran a timer.',
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5))
+discord_rate_limits = registry.counter(
+    'shopbot_discord_rate_limited_total', 'Discord 429 responses that discord.py retried.')
+discord_rate_limit_wait = registry.counter(
+    'shopbot_discord_rate_limit_wait_seconds_total', 'Time discord.py waited before retrying after a 429.')
+
+
+class RateLimitLogHandler(logging.Handler):
+    """Counts the 429 retries discord.py logs, which it does not otherwise expose."""
+
+    def emit(self, record):
+        if isinstance(record.msg, str) and record.msg.startswith('We are being rate limited'):
+            discord_rate_limits.inc()
+            # discord.py logs (method, url, retry_after)
+            if len(record.args or ()) >= 3 and isinstance(record.args[2], (int, float)):
+                discord_rate_limit_wait.inc(amount=record.args[2])
+
+
+def watch_discord_rate_limits():
+    logger = logging.getLogger('discord.http')
+    if not any(isinstance(handler, RateLimitLogHandler) for handler in logger.handlers):
+        logger.addHandler(RateLimitLogHandler(logging.WARNING))
+
+
+async def monitor_loop_lag(interval=LOOP_LAG_INTERVAL):
+    """Record how much later than requested each sleep wakes up."""
+    loop = asyncio.get_running_loop()
+    while True:
+        started = loop.time()
+        await asyncio.sleep(interval)
+        loop_lag_seconds.observe(max(0.0, loop.time() - started - interval))
+
+
+class MetricsServer:
+    """Serves GET /metrics in Prometheus text format, plus the loop lag probe."""
+
+    def __init__(self, registry=registry, host=METRICS_HOST, port=METRICS_PORT):
+        self.registry = registry
+        self.host = host
+        self.port = port
+        self._runner = None
+        self._lag_task = None
+
+    async def handle_metrics(self, request):
+        from aiohttp import web
+        return web.Response(text=self.registry.render(), content_type='text/plain', charset='utf-8',
+                            headers={'X-Content-Type-Options': 'nosniff'})
+
+    async def start(self):
+        if self._lag_task is None:
+            self._lag_task = asyncio.ensure_future(monitor_loop_lag())
+        if not self.port or self._runner is not None:
+            return
+        from aiohttp import web
+        app = web.Application()
+        app.router.add_get('/metrics', self.handle_metrics)
+        runner = web.AppRunner(app, access_log=None)
+        await runner.setup()
+        try:
+            await web.TCPSite(runner, self.host, self.port).start()
+        except OSError as e:
+            log.warning('Could not start metrics endpoint on %s:%s: %s', self.host, self.port, e)
+            await runner.cleanup()
+            return
+        self._runner = runner
+        log.info('Metrics available at http://%s:%s/metrics', self.host, self.port)
+
+    async def stop(self):
+        if self._lag_task is not None:
+            self._lag_task.cancel()
+            self._lag_task = None
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
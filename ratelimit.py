@@ -0,0 +1,102 @@
+import asyncio
+import time
+from collections import OrderedDict
+
+
+class TokenBucket:
+    """Classic token bucket: rate tokens per second, up to burst tokens."""
+
+    __slots__ = ('rate', 'burst', 'tokens', 'updated')
+
+    def __init__(self, rate, burst, now=None):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic() if now is None else now
+
+    def _refill(self, now):
+        elapsed = now - self.updated
+        if elapsed > 0:
+            self.tokens = min(self.burst, self.tokens + elapsed * self.rate)
+            self.updated = now
+
+    def try_acquire(self, now=None):
+        """Take a token if one is available."""
+        now = time.monotonic() if now is None else now
+        self._refill(now)
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+    def wait_time(self, now=None):
+        """Seconds until the next token is available."""
+        now = time.monotonic() if now is None else now
+        self._refill(now)
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+
+class KeyedRateLimiter:
+    """A token bucket per key (e.g. a user), created on first use.
+
+    A bucket left idle long enough to refill completely is no different
+    from a new one, so it is dropped. Buckets are kept in least recently
+    used order, which makes eviction cost proportional to the buckets
+    evicted, and memory stays proportional to the recently active keys.
+    """
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self._buckets = OrderedDict()
+
+    def __len__(self):
+        return len(self._buckets)
+
+    def _evict(self, now):
+        refill_time = self.burst / self.rate
+        buckets = self._buckets
+        while buckets:
+            key, bucket = next(iter(buckets.items()))
+            if now - bucket.updated < refill_time:
+                break
+            del buckets[key]
+
+    def wait_time(self, key, now=None):
+        """Seconds until key has a token available."""
+        now = time.monotonic() if now is None else now
+        self._evict(now)
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            return 0.0
+        self._buckets.move_to_end(key)
+        return bucket.wait_time(now)
+
+    def try_acquire(self, key, now=None):
+        """Take a token from key's bucket if one is available."""
+        now = time.monotonic() if now is None else now
+        self._evict(now)
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = TokenBucket(self.rate, self.burst, now)
+        else:
+            self._buckets.move_to_end(key)
+        return bucket.try_acquire(now)
+
+
+class AsyncRateLimiter:
+    """Paces coroutines so they start no faster than the bucket allows."""
+
+    def __init__(self, rate, burst=None):
+        self.bucket = TokenBucket(rate, burst or rate)
+        self.waited = 0.0
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while not self.bucket.try_acquire():
+                delay = self.bucket.wait_time()
+                self.waited += delay
+                await asyncio.sleep(delay)
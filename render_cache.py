@@ -0,0 +1,54 @@
+import os
+from collections import OrderedDict
+
+from metrics import render_seconds
+
+# Maximum number of rendered messages kept per shop snapshot
+RENDER_CACHE_SIZE = int(os.getenv('RENDER_CACHE_SIZE', '256'))
+
+
+class RenderCache:
+    """LRU cache of ready-to-send message payloads.
+
+    Entries are keyed by (command, arguments) for the current snapshot; the
+    whole cache is dropped as soon as a snapshot with a different content
+    hash is rendered.
+    """
+
+    def __init__(self, maxsize=RENDER_CACHE_SIZE):
+        self.maxsize = maxsize
+        self.snapshot_hash = None
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def clear(self):
+        self._entries.clear()
+
+    def get(self, snapshot, command, args, render):
+        """Return the cached payload for command/args, rendering it on a miss.
+
+        render is called as render(snapshot, *args). Payloads are shared
+        between callers and must not be modified.
+        """
+        if snapshot.content_hash != self.snapshot_hash:
+            self._entries.clear()
+            self.snapshot_hash = snapshot.content_hash
+
+        key = (command, args)
+        payload = self._entries.get(key)
+        if payload is not None:
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return payload
+
+        self.misses += 1
+        with render_seconds.time(command):
+            payload = render(snapshot, *args)
+        self._entries[key] = payload
+        if len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+        return payload
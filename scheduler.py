@@ -0,0 +1,130 @@
+import asyncio
+import logging
+import os
+import random
+from datetime import datetime, timedelta, timezone
+
+from shop_model import next_daily_rotation
+
+log = logging.getLogger(__name__)
+
+# Poll timing in seconds (override with environment variables)
+POLL_LEAD = float(os.getenv('SHOP_POLL_LEAD', '60'))
+POLL_WINDOW = float(os.getenv('SHOP_POLL_WINDOW', '1800'))
+POLL_INTERVAL = float(os.getenv('SHOP_POLL_INTERVAL', '30'))
+IDLE_INTERVAL = float(os.getenv('SHOP_IDLE_INTERVAL', '3600'))
+MAX_BACKOFF = float(os.getenv('SHOP_POLL_MAX_BACKOFF', '300'))
+JITTER = float(os.getenv('SHOP_POLL_JITTER', '0.2'))
+
+
+def utc_now():
+    return datetime.now(timezone.utc)
+
+
+class RotationScheduler:
+    """Polls the shop densely around each rotation and rarely in between.
+
+    poll is a coroutine function returning the current snapshot, or None if
+    the refresh failed. snapshot_source returns the cached snapshot, which
+    supplies the next rotation time. clock, sleep and rng can be replaced
+    to drive the scheduler from tests.
+    """
+
+    def __init__(self, poll, snapshot_source, clock=utc_now, sleep=asyncio.sleep,
+                 rng=random.random, lead=POLL_LEAD, window=POLL_WINDOW,
+                 interval=POLL_INTERVAL, idle_interval=IDLE_INTERVAL,
+                 max_backoff=MAX_BACKOFF, jitter=JITTER):
+        self.poll = poll
+        self.snapshot_source = snapshot_source
+        self.clock = clock
+        self.sleep = sleep
+        self.rng = rng
+        self.lead = lead
+        self.window = window
+        self.interval = interval
+        self.idle_interval = idle_interval
+        self.max_backoff = max_backoff
+        self.jitter = jitter
+
+        self.target = None
+        self.failures = 0
+        self.polls = 0
+        self._fingerprint = None
+        self._window_fingerprint = None
+        self._task = None
+
+    def next_rotation(self, now):
+        snapshot = self.snapshot_source()
+        if snapshot is None:
+            return next_daily_rotation(now)
+        return snapshot.next_rotation(now)
+
+    def _jittered(self, delay):
+        return delay * (1 + self.jitter * (2 * self.rng() - 1))
+
+    def window_delay(self):
+        """Seconds to wait between polls inside the rotation window."""
+        delay = self.interval
+        if self.failures:
+            delay = min(self.interval * 2 ** self.failures, self.max_backoff)
+        return self._jittered(delay)
+
+    async def _poll(self):
+        self.polls += 1
+        try:
+            snapshot = await self.poll()
+        except Exception:
+            log.exception('Error polling shop')
+            snapshot = None
+
+        if snapshot is None:
+            self.failures += 1
+        else:
+            self.failures = 0
+            self._fingerprint = snapshot.fingerprint
+
+    async def step(self):
+        """Run one scheduling step: sleep, then poll when due."""
+        now = self.clock()
+
+        if self.target is None:
+            rotation = self.next_rotation(now)
+            wake_at = rotation - timedelta(seconds=self.lead)
+            wait = (wake_at - now).total_seconds()
+            if wait > self.idle_interval:
+                # Long way to the rotation: poll occasionally as a safety net
+                await self.sleep(self._jittered(self.idle_interval))
+                await self._poll()
+                return
+            if wait > 0:
+                await self.sleep(wait)
+            self.target = rotation
+            self._window_fingerprint = self._fingerprint
+
+        await self._poll()
+        now = self.clock()
+        if self._fingerprint != self._window_fingerprint:
+            # The new shop is in; go back to sleeping until the next rotation
+            self.target = None
+            return
+        if now > self.target + timedelta(seconds=self.window):
+            log.warning('Shop did not rotate within the polling window')
+            self.target = None
+            return
+        await self.sleep(self.window_delay())
+
+    async def run(self):
+        await self._poll()
+        while True:
+            await self.step()
+
+    def start(self):
+        """Start the scheduler unless it is already running."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.ensure_future(self.run())
+        return self._task
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
@@ -0,0 +1,250 @@
+import asyncio
+import logging
+import os
+import random
+import time
+from urllib.parse import urlsplit
+
+import aiohttp
+
+from breaker import CircuitBreaker
+from metrics import shop_fetch_responses, shop_fetch_seconds
+
+log = logging.getLogger(__name__)
+
+# Fortnite API URL - using a more reliable endpoint
+FORTNITE_API_URL = os.getenv('FORTNITE_API_URL', 'https://fortnite-api.com/v2/shop')
+# Comma separated endpoints serving the same response, tried in order when it fails
+FORTNITE_API_MIRRORS = [url.strip() for url in os.getenv('FORTNITE_API_MIRRORS', '').split(',') if url.strip()]
+
+# HTTP settings (override with environment variables)
+CONNECT_TIMEOUT = float(os.getenv('SHOP_CONNECT_TIMEOUT', '5'))
+READ_TIMEOUT = float(os.getenv('SHOP_READ_TIMEOUT', '10'))
+POOL_SIZE = int(os.getenv('SHOP_POOL_SIZE', '10'))
+KEEPALIVE_TIMEOUT = float(os.getenv('SHOP_KEEPALIVE_TIMEOUT', '60'))
+
+# Resilience settings (override with environment variables)
+# Passes over the endpoints per fetch, with jittered exponential backoff between them
+FETCH_ATTEMPTS = int(os.getenv('SHOP_FETCH_ATTEMPTS', '3'))
+RETRY_BASE_DELAY = float(os.getenv('SHOP_RETRY_BASE_DELAY', '0.5'))
+RETRY_MAX_DELAY = float(os.getenv('SHOP_RETRY_MAX_DELAY', '8'))
+# Seconds before a slow request is raced against a second one (0 turns hedging off)
+HEDGE_DELAY = float(os.getenv('SHOP_HEDGE_DELAY', '2'))
+# Failures in a row that open an endpoint's circuit breaker, and seconds before it is tried again
+BREAKER_FAILURES = int(os.getenv('SHOP_BREAKER_FAILURES', '5'))
+BREAKER_RESET = float(os.getenv('SHOP_BREAKER_RESET', '30'))
+
+# aiohttp only decodes brotli when a brotli package is installed
+try:
+    import brotli  # noqa: F401
+    ACCEPT_ENCODING = 'gzip, deflate, br'
+except ImportError:
+    try:
+        import brotlicffi  # noqa: F401
+        ACCEPT_ENCODING = 'gzip, deflate, br'
+    except ImportError:
+        ACCEPT_ENCODING = 'gzip, deflate'
+
+# Returned by fetch_shop when the upstream answers 304 Not Modified
+NOT_MODIFIED = object()
+
+# Request counters, shown by /info
+fetch_stats = {
+    'requests': 0, 'ok': 0, 'not_modified': 0, 'errors': 0,
+    'retries': 0, 'hedged': 0, 'short_circuited': 0,
+}
+
+# Circuit breaker per endpoint URL
+breakers = {}
+
+_session = None
+# (ETag, Last-Modified) of the last good response per endpoint URL
+_validators = {}
+
+
+async def get_session():
+    """Return the shared HTTP session, creating it on first use."""
+    global _session
+    if _session is None or _session.closed:
+        connector = aiohttp.TCPConnector(
+            limit=POOL_SIZE,
+            keepalive_timeout=KEEPALIVE_TIMEOUT,
+            ttl_dns_cache=300
+        )
+        timeout = aiohttp.ClientTimeout(
+            total=None,
+            sock_connect=CONNECT_TIMEOUT,
+            sock_read=READ_TIMEOUT
+        )
+        _session = aiohttp.ClientSession(
+            connector=connector,
+            timeout=timeout,
+            headers={
+                'User-Agent': 'FortniteShopBot (discord.py)',
+                'Accept-Encoding': ACCEPT_ENCODING
+            }
+        )
+    return _session
+
+
+async def close_session():
+    """Close the shared HTTP session."""
+    global _session
+    if _session is not None and not _session.closed:
+        await _session.close()
+    _session = None
+
+
+def endpoint_name(url):
+    """Host of an endpoint, used to label its metrics."""
+    return urlsplit(url).netloc or url
+
+
+def endpoints():
+    """The shop endpoints in the order they are tried."""
+    return [FORTNITE_API_URL, *FORTNITE_API_MIRRORS]
+
+
+def get_breaker(url):
+    breaker = breakers.get(url)
+    if breaker is None:
+        breaker = breakers[url] = CircuitBreaker(BREAKER_FAILURES, BREAKER_RESET)
+    return breaker
+
+
+def conditional_headers(url):
+    """Return If-None-Match/If-Modified-Since headers for the last good response from url."""
+    headers = {}
+    etag, last_modified = _validators.get(url, (None, None))
+    if etag:
+        headers['If-None-Match'] = etag
+    if last_modified:
+        headers['If-Modified-Since'] = last_modified
+    return headers
+
+
+def has_shop(shop_data):
+    """Whether a 200 response carries a shop rather than an error body."""
+    data = shop_data.get('data') if isinstance(shop_data, dict) else None
+    return isinstance(data, dict) and bool(data.get('entries'))
+
+
+def backoff_delay(attempt):
+    """Full-jitter exponential backoff before retry number attempt (1-based)."""
+    return random.uniform(0, min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** (attempt - 1)))
+
+
+async def request_shop(url, conditional=False):
+    """Make one request to one endpoint; returns the shop data, NOT_MODIFIED or None."""
+    headers = conditional_headers(url) if conditional else {}
+    breaker = get_breaker(url)
+    endpoint = endpoint_name(url)
+    fetch_stats['requests'] += 1
+    started = time.perf_counter()
+    status = 'error'
+    try:
+        session = await get_session()
+        async with session.get(url, headers=headers) as response:
+            status = str(response.status)
+            if response.status == 304 and headers:
+                fetch_stats['not_modified'] += 1
+                breaker.record_success()
+                return NOT_MODIFIED
+            if response.status == 200:
+                shop_data = await response.json(content_type=None)
+                if has_shop(shop_data):
+                    _validators[url] = (response.headers.get('ETag'), response.headers.get('Last-Modified'))
+                    fetch_stats['ok'] += 1
+                    breaker.record_success()
+                    return shop_data
+                # A degraded upstream can answer 200 with an error body
+                status = 'invalid_payload'
+                log.warning('API response from %s carries no shop', endpoint)
+            else:
+                log.warning('API request to %s failed with status code: %s', endpoint, response.status)
+    except asyncio.CancelledError:
+        # Lost a hedged race
+        status = 'cancelled'
+        breaker.abandon()
+        raise
+    except asyncio.TimeoutError:
+        status = 'timeout'
+        log.warning('Error fetching shop from %s: request timed out', endpoint)
+    except aiohttp.ClientError as e:
+        log.warning('Error fetching shop from %s: %r', endpoint, e)
+    except ValueError as e:
+        # Invalid JSON, or a body that is not valid UTF-8
+        status = 'invalid_json'
+        log.warning('Error parsing JSON response from %s: %s', endpoint, e)
+    except Exception:
+        # Anything else still counts against the breaker rather than leaving it half-open
+        log.exception('Unexpected error fetching shop from %s', endpoint)
+    finally:
+        shop_fetch_seconds.observe(time.perf_counter() - started, endpoint)
+        shop_fetch_responses.inc(endpoint, status)
+    fetch_stats['errors'] += 1
+    breaker.record_failure()
+    return None
+
+
+async def _fetch_once(conditional):
+    """Try the endpoints in order, racing a second request against a slow one."""
+    remaining = iter(endpoints())
+
+    def next_endpoint():
+        for url in remaining:
+            if get_breaker(url).allow():
+                return url
+        return None
+
+    first = next_endpoint()
+    if first is None:
+        return None
+    pending = {asyncio.ensure_future(request_shop(first, conditional))}
+    hedged = not HEDGE_DELAY
+    try:
+        while pending:
+            done, pending = await asyncio.wait(
+                pending, timeout=None if hedged else HEDGE_DELAY, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                result = task.result()
+                if result is not None:
+                    return result
+            if not done:
+                # Slow response: race it against one more request, to a mirror if there is one
+                hedged = True
+                fetch_stats['hedged'] += 1
+                pending.add(asyncio.ensure_future(request_shop(next_endpoint() or first, conditional)))
+            elif not pending:
+                # Every request so far failed: fail over to the next endpoint
+                url = next_endpoint()
+                if url is not None:
+                    pending.add(asyncio.ensure_future(request_shop(url, conditional)))
+        return None
+    finally:
+        for task in pending:
+            task.cancel()
+
+
+async def fetch_shop(conditional=False):
+    """Fetch the current Fortnite item shop data, or None if every endpoint fails.
+
+    Endpoints are tried in order, skipping those whose circuit breaker is
+    open, with up to FETCH_ATTEMPTS passes separated by jittered backoff.
+    When every breaker is open this returns None straight away, so callers
+    fall back to the last good snapshot instead of waiting on timeouts.
+
+    With conditional=True the request carries the validators from the last
+    successful response, and NOT_MODIFIED is returned if the shop is unchanged.
+    """
+    for attempt in range(FETCH_ATTEMPTS):
+        if not any(get_breaker(url).available() for url in endpoints()):
+            fetch_stats['short_circuited'] += 1
+            return None
+        if attempt:
+            fetch_stats['retries'] += 1
+            await asyncio.sleep(backoff_delay(attempt))
+        result = await _fetch_once(conditional)
+        if result is not None:
+            return result
+    return None
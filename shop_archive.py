@@ -0,0 +1,259 @@
+import argparse
+import asyncio
+import bisect
+import gzip
+import json
+import logging
+import os
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timezone
+
+from shop_model import ShopSnapshot
+
+log = logging.getLogger(__name__)
+
+# Directory holding one compressed file per shop day
+SHOP_ARCHIVE_DIR = os.getenv('SHOP_ARCHIVE_DIR', 'shop_archive')
+
+
+def shop_day(snapshot):
+    """Return the YYYY-MM-DD day a snapshot belongs to."""
+    if snapshot.date:
+        return snapshot.date[:10]
+    return datetime.now(timezone.utc).date().isoformat()
+
+
+def snapshot_columns(snapshot):
+    """Store a snapshot column by column, which compresses far better than rows."""
+    entries = snapshot.entries
+    return {
+        'offer_id': [entry.offer_id for entry in entries],
+        'item_id': [entry.item.id for entry in entries],
+        'name': [entry.item.name for entry in entries],
+        'rarity': [entry.item.rarity for entry in entries],
+        'type': [entry.item.type for entry in entries],
+        'final_price': [entry.final_price for entry in entries],
+        'regular_price': [entry.regular_price for entry in entries],
+        'bundle_name': [entry.bundle_name for entry in entries],
+    }
+
+
+class Appearance:
+    """One day an item was in the shop."""
+
+    __slots__ = ('day', 'final_price', 'regular_price')
+
+    def __init__(self, day, final_price, regular_price):
+        self.day = day
+        self.final_price = final_price
+        self.regular_price = regular_price
+
+    def __lt__(self, other):
+        return self.day < other.day
+
+    def __repr__(self):
+        return f'Appearance({self.day!r}, {self.final_price!r}, {self.regular_price!r})'
+
+
+class ShopArchive:
+    """Append-only archive of every shop rotation, indexed by item ID.
+
+    Each day has one gzip file; every rotation seen that day is appended to
+    it as its own gzip member holding one columnar JSON record, so nothing
+    already written is ever rewritten. The index (item ID -> appearances)
+    is built once when the archive is loaded and kept up to date as
+    rotations are added, so lookups never read the files.
+    """
+
+    def __init__(self, directory=SHOP_ARCHIVE_DIR):
+        self.directory = directory
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='shop-archive')
+        self._fingerprints = set()
+        self._appearances = {}
+        self._items = {}
+        self._names = {}
+        self._sorted_names = None
+
+    async def _run(self, func, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, func, *args)
+
+    def _path(self, day):
+        return os.path.join(self.directory, f'{day}.json.gz')
+
+    # Index
+
+    def _add_record(self, record):
+        """Add one archived rotation to the index; returns False if it was already there."""
+        if record['fingerprint'] in self._fingerprints:
+            return False
+        self._fingerprints.add(record['fingerprint'])
+
+        day = record['day']
+        columns = record['columns']
+        rows = zip(columns['item_id'], columns['name'], columns['rarity'], columns['type'],
+                   columns['final_price'], columns['regular_price'])
+        for item_id, name, rarity, item_type, final_price, regular_price in rows:
+            if not item_id:
+                continue
+            appearances = self._appearances.setdefault(item_id, [])
+            # One appearance per day; several rotations in a day share it
+            index = bisect.bisect_left(appearances, Appearance(day, 0, 0))
+            if index < len(appearances) and appearances[index].day == day:
+                continue
+            appearances.insert(index, Appearance(day, final_price, regular_price))
+
+            if item_id not in self._items or self._items[item_id][3] <= day:
+                self._items[item_id] = (name, rarity, item_type, day)
+                if self._names.get(name.casefold()) != item_id:
+                    self._names[name.casefold()] = item_id
+                    self._sorted_names = None
+        return True
+
+    def _read_day(self, path):
+        """Yield the records in one day file, stopping at a damaged tail."""
+        try:
+            with gzip.open(path, 'rt', encoding='utf-8') as f:
+                for line in f:
+                    yield json.loads(line)
+        except (OSError, EOFError, zlib.error, ValueError) as e:
+            log.warning('Stopped reading %s at damaged data: %s', path, e)
+
+    def _load(self):
+        # Runs before the bot serves any command, so it can fill the index directly
+        if not os.path.isdir(self.directory):
+            return 0
+        count = 0
+        for filename in sorted(os.listdir(self.directory)):
+            if filename.endswith('.json.gz'):
+                for record in self._read_day(os.path.join(self.directory, filename)):
+                    count += self._add_record(record)
+        return count
+
+    async def load(self):
+        """Build the index from the archive files; returns the number of rotations."""
+        return await self._run(self._load)
+
+    # Writes
+
+    def _write(self, record):
+        os.makedirs(self.directory, exist_ok=True)
+        line = json.dumps(record, separators=(',', ':')) + '\n'
+        with gzip.open(self._path(record['day']), 'ab') as f:
+            f.write(line.encode('utf-8'))
+
+    def _record(self, snapshot):
+        return {
+            'day': shop_day(snapshot),
+            'date': snapshot.date,
+            'fingerprint': snapshot.fingerprint,
+            'columns': snapshot_columns(snapshot),
+        }
+
+    def index(self, snapshot):
+        """Add a rotation another process archived to the index, without writing it."""
+        return self._add_record(self._record(snapshot))
+
+    async def archive(self, snapshot):
+        """Append a rotation unless the same shop is already archived."""
+        if snapshot.fingerprint in self._fingerprints:
+            return False
+        record = self._record(snapshot)
+        try:
+            await self._run(self._write, record)
+        except OSError as e:
+            log.error('Error archiving shop: %s', e)
+            return False
+        # The index is only changed on the event loop, never while a command reads it
+        return self._add_record(record)
+
+    def import_directory(self, path):
+        """Backfill from saved /v2/shop responses or snapshot records (*.json)."""
+        imported = 0
+        for filename in sorted(os.listdir(path)):
+            if not filename.endswith('.json'):
+                continue
+            try:
+                with open(os.path.join(path, filename), encoding='utf-8') as f:
+                    data = json.load(f)
+                if 'entries' in data:
+                    snapshot = ShopSnapshot.from_record(data)
+                else:
+                    snapshot = ShopSnapshot.from_payload(data)
+            except (OSError, ValueError, KeyError, TypeError) as e:
+                log.warning('Skipping %s: %s', filename, e)
+                continue
+            if snapshot is None or snapshot.fingerprint in self._fingerprints:
+                continue
+            record = self._record(snapshot)
+            self._write(record)
+            self._add_record(record)
+            imported += 1
+        return imported
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+
+    # Lookups
+
+    def __len__(self):
+        return len(self._fingerprints)
+
+    def resolve(self, name):
+        """Return the item ID for a name (ignoring case) or an item ID, or None."""
+        name = name.strip()
+        item_id = self._names.get(name.casefold())
+        if item_id is None and name in self._items:
+            item_id = name
+        return item_id
+
+    def item(self, item_id):
+        """Return (name, rarity, type) as last seen for an item."""
+        return self._items[item_id][:3]
+
+    def history(self, item_id):
+        """Return every appearance of an item, oldest first."""
+        return self._appearances.get(item_id, [])
+
+    def last_seen(self, item_id):
+        appearances = self._appearances.get(item_id)
+        return appearances[-1] if appearances else None
+
+    def days_since(self, item_id, today=None):
+        """Days since an item was last in the shop (0 if it is in today's shop)."""
+        appearance = self.last_seen(item_id)
+        if appearance is None:
+            return None
+        today = today or datetime.now(timezone.utc).date()
+        return (today - date.fromisoformat(appearance.day)).days
+
+    def complete(self, prefix, limit=25):
+        """Return archived item names starting with prefix, ignoring case."""
+        if self._sorted_names is None:
+            self._sorted_names = sorted(self._names)
+        prefix = prefix.strip().casefold()
+        start = bisect.bisect_left(self._sorted_names, prefix)
+        names = []
+        for key in self._sorted_names[start:start + limit]:
+            if not key.startswith(prefix):
+                break
+            names.append(self._items[self._names[key]][0])
+        return names
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Backfill the shop archive from saved shop JSON files.')
+    parser.add_argument('source', help='directory of saved /v2/shop responses')
+    parser.add_argument('--archive', default=SHOP_ARCHIVE_DIR, help='archive directory')
+    args = parser.parse_args()
+
+    archive = ShopArchive(args.archive)
+    archive._load()
+    imported = archive.import_directory(args.source)
+    archive.close()
+    print(f'Imported {imported} new rotation(s); the archive now holds {len(archive)}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,123 @@
+import asyncio
+import logging
+import os
+import time
+from datetime import datetime, timezone
+
+from metrics import shop_cache_requests
+from shop_api import NOT_MODIFIED
+from shop_model import ShopSnapshot
+
+# Cache settings (override with environment variables)
+SHOP_CACHE_TTL = float(os.getenv('SHOP_CACHE_TTL', '600'))
+SHOP_STALE_WAIT = float(os.getenv('SHOP_STALE_WAIT', '2'))
+SHOP_RETRY_AFTER = float(os.getenv('SHOP_RETRY_AFTER', '30'))
+
+log = logging.getLogger(__name__)
+
+
+class ShopCache:
+    """In-process shop snapshot shared by every command.
+
+    Concurrent callers share a single upstream request, and the last good
+    snapshot is served while a refresh is slow or failing.
+    """
+
+    def __init__(self, fetcher, ttl=SHOP_CACHE_TTL, stale_wait=SHOP_STALE_WAIT,
+                 retry_after=SHOP_RETRY_AFTER):
+        self.fetcher = fetcher
+        self.ttl = ttl
+        self.stale_wait = stale_wait
+        self.retry_after = retry_after
+        self.data = None
+        self.fetched_at = None
+        self.expires_at = 0.0
+        self.failures = 0
+        self._refresh_task = None
+
+    def is_fresh(self):
+        return self.data is not None and time.monotonic() < self.expires_at
+
+    def peek(self):
+        """Return the cached snapshot without touching the network."""
+        return self.data
+
+    def invalidate(self):
+        self.expires_at = 0.0
+
+    async def get(self):
+        """Return the shop snapshot, refreshing it if it has expired."""
+        if self.is_fresh():
+            shop_cache_requests.inc('fresh')
+            return self.data
+
+        task = self._start_refresh()
+        if self.data is None:
+            shop_cache_requests.inc('miss')
+            return await asyncio.shield(task)
+
+        # Stale-while-revalidate: give the refresh a moment, then fall back
+        try:
+            snapshot = await asyncio.wait_for(asyncio.shield(task), timeout=self.stale_wait)
+            shop_cache_requests.inc('refreshed')
+            return snapshot
+        except asyncio.TimeoutError:
+            shop_cache_requests.inc('stale')
+            return self.data
+
+    async def refresh(self):
+        """Force a refresh, sharing any request that is already in flight."""
+        return await asyncio.shield(self._start_refresh())
+
+    def prefetch(self):
+        """Start a refresh in the background if the snapshot has expired."""
+        if not self.is_fresh():
+            self._start_refresh()
+
+    def _start_refresh(self):
+        if self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = asyncio.ensure_future(self._do_refresh())
+        return self._refresh_task
+
+    def _failed(self):
+        # Keep serving the last good snapshot and back off before retrying
+        self.failures += 1
+        if self.data is not None:
+            self.expires_at = time.monotonic() + self.retry_after
+        return self.data
+
+    async def _do_refresh(self):
+        try:
+            # Only ask for a 304 when there is a snapshot to fall back on
+            shop_data = await self.fetcher(conditional=self.data is not None)
+            if shop_data is NOT_MODIFIED:
+                self.store(self.data)
+                return self.data
+            snapshot = ShopSnapshot.from_payload(shop_data)
+        except Exception:
+            log.exception('Error refreshing the shop')
+            return self._failed()
+
+        if snapshot is None:
+            return self._failed()
+
+        if self.data is not None and snapshot.content_hash == self.data.content_hash:
+            # Unchanged shop: keep the existing snapshot and its indexes
+            snapshot = self.data
+        self.store(snapshot)
+        return self.data
+
+    def store(self, snapshot, stale=False):
+        """Install a snapshot and compute when it expires.
+
+        A stale snapshot (e.g. one loaded from disk) is served straight away
+        but refreshed on the next request.
+        """
+        self.failures = 0
+        now = datetime.now(timezone.utc)
+        until_rotation = (snapshot.next_rotation(now) - now).total_seconds()
+        lifetime = 0.0 if stale else max(0.0, min(self.ttl, until_rotation))
+
+        self.data = snapshot
+        self.fetched_at = now
+        self.expires_at = time.monotonic() + lifetime
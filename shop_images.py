@@ -0,0 +1,238 @@
+import asyncio
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+# Pillow is optional; without it the shop is only sent as text embeds
+try:
+    from PIL import Image, ImageDraw, ImageFont
+except ImportError:
+    Image = None
+
+log = logging.getLogger(__name__)
+
+# Image settings (override with environment variables)
+SHOP_IMAGE_DIR = os.getenv('SHOP_IMAGE_DIR', os.path.join('image_cache', 'shop'))
+IMAGE_WORKERS = int(os.getenv('IMAGE_WORKERS', '2'))
+# Longest a shop update waits for its images before going out as text only
+IMAGE_RENDER_WAIT = float(os.getenv('IMAGE_RENDER_WAIT', '10'))
+# Bytes of images attached to one message, under Discord's default 8 MiB
+# upload limit with room for the rest of the request
+IMAGE_UPLOAD_BYTES = int(os.getenv('IMAGE_UPLOAD_BYTES', str(7 * 1024 * 1024)))
+
+TILE_SIZE = 192
+LABEL_HEIGHT = 40
+COLUMNS = 8
+ROWS = 6
+TILES_PER_IMAGE = COLUMNS * ROWS
+# Most grid images drawn per rotation
+MAX_IMAGES = 10
+# Discord allows 10 attachments per message
+MAX_FILES_PER_MESSAGE = 10
+
+
+def darken(color, factor=0.55):
+    return tuple(int(channel * factor) for channel in color)
+
+
+def compose_grid(tiles, path):
+    """Draw (icon_path, rgb, name, price) tiles in a grid and save it as a PNG.
+
+    Runs in a worker process, so it only takes and returns plain values.
+    """
+    rows = -(-len(tiles) // COLUMNS)
+    columns = min(len(tiles), COLUMNS)
+    cell_height = TILE_SIZE + LABEL_HEIGHT
+    canvas = Image.new('RGB', (columns * TILE_SIZE, rows * cell_height), (24, 24, 28))
+    draw = ImageDraw.Draw(canvas)
+    font = ImageFont.load_default()
+
+    for index, (icon_path, color, name, price) in enumerate(tiles):
+        x = (index % COLUMNS) * TILE_SIZE
+        y = (index // COLUMNS) * cell_height
+        draw.rectangle((x + 2, y + 2, x + TILE_SIZE - 3, y + TILE_SIZE - 3), fill=color)
+        draw.rectangle((x + 2, y + TILE_SIZE, x + TILE_SIZE - 3, y + cell_height - 3), fill=darken(color))
+
+        if icon_path:
+            try:
+                with Image.open(icon_path) as icon:
+                    icon = icon.convert('RGBA')
+                    icon.thumbnail((TILE_SIZE - 8, TILE_SIZE - 8))
+                    offset = (x + (TILE_SIZE - icon.width) // 2, y + (TILE_SIZE - icon.height) // 2)
+                    canvas.paste(icon, offset, icon)
+            except OSError:
+                pass
+
+        label = name if len(name) <= 28 else name[:27] + '…'
+        draw.text((x + 8, y + TILE_SIZE + 4), label, fill=(255, 255, 255), font=font)
+        draw.text((x + 8, y + TILE_SIZE + 20), f'{price:,} V-Bucks', fill=(255, 215, 0), font=font)
+
+    tmp_path = path + '.tmp'
+    canvas.save(tmp_path, format='PNG', optimize=True)
+    os.replace(tmp_path, path)
+    return path
+
+
+def pool_context():
+    """Start method for the render workers.
+
+    The bot already runs threads (logging, SQLite, archive) when the pool
+    starts, and forking a threaded process can deadlock the child, so the
+    workers are started from a clean forkserver (or spawned where there is
+    none). Only this module is preloaded, not the bot script.
+    """
+    if 'forkserver' in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context('forkserver')
+        context.set_forkserver_preload([__name__])
+        return context
+    return multiprocessing.get_context('spawn')
+
+
+def attachment_groups(paths, max_bytes=IMAGE_UPLOAD_BYTES, max_files=MAX_FILES_PER_MESSAGE):
+    """Split image files into per-message groups that fit the upload budget.
+
+    A file too big to send even on its own is left out.
+    """
+    groups = []
+    group = []
+    group_bytes = 0
+    for path in paths:
+        try:
+            size = os.path.getsize(path)
+        except OSError:
+            continue
+        if size > max_bytes:
+            log.warning('Leaving out shop image %s: %d bytes is over the upload budget', path, size)
+            continue
+        if group and (group_bytes + size > max_bytes or len(group) >= max_files):
+            groups.append(group)
+            group = []
+            group_bytes = 0
+        group.append(path)
+        group_bytes += size
+    if group:
+        groups.append(group)
+    return groups
+
+
+class ShopImageRenderer:
+    """Renders each shop rotation as grid PNGs, once per shop fingerprint.
+
+    Icons come from the shared image cache, and the grids are drawn in a
+    process pool so the event loop never blocks. The finished files are
+    reused by /shop and by every broadcast.
+    """
+
+    def __init__(self, color_for, image_cache, image_dir=SHOP_IMAGE_DIR, workers=IMAGE_WORKERS):
+        self.color_for = color_for
+        self.image_cache = image_cache
+        self.image_dir = image_dir
+        self.workers = workers
+        self._pool = None
+        self._renders = {}
+        self._paths = {}
+        self._latest = None
+
+    @property
+    def available(self):
+        return Image is not None
+
+    def peek(self, snapshot):
+        """Return the rendered image paths for a snapshot if they are ready."""
+        return self._paths.get(snapshot.fingerprint)
+
+    def prefetch(self, snapshot):
+        """Start rendering a snapshot in the background."""
+        if self.available and snapshot.fingerprint not in self._paths:
+            asyncio.ensure_future(self.render(snapshot))
+
+    async def render(self, snapshot, timeout=None):
+        """Return the image paths for a snapshot, rendering them if needed, or None.
+
+        With a timeout, None is returned if the images are not ready in time;
+        the render carries on in the background for later callers.
+        """
+        if not self.available or not snapshot.entries:
+            return None
+        fingerprint = snapshot.fingerprint
+        if fingerprint in self._paths:
+            return self._paths[fingerprint]
+
+        # Concurrent callers share one render per rotation
+        task = self._renders.get(fingerprint)
+        if task is None:
+            task = asyncio.ensure_future(self._render(snapshot))
+            self._renders[fingerprint] = task
+            self._latest = fingerprint
+            task.add_done_callback(lambda task: self._finished(fingerprint, task))
+        try:
+            return await asyncio.wait_for(asyncio.shield(task), timeout)
+        except asyncio.TimeoutError:
+            log.warning('Shop images not ready after %ss, sending without them', timeout)
+            return None
+        except Exception:
+            # Logged by _finished
+            return None
+
+    def _finished(self, fingerprint, task):
+        self._renders.pop(fingerprint, None)
+        if task.cancelled():
+            return
+        if task.exception() is not None:
+            log.error('Error rendering shop images', exc_info=task.exception())
+            return
+        if fingerprint != self._latest:
+            # A newer rotation started rendering meanwhile
+            return
+        # Only the latest rotation is kept, in memory and on disk
+        paths = task.result()
+        self._paths = {fingerprint: paths}
+        self._remove_old(paths)
+
+    def _remove_old(self, paths):
+        """Delete grid images from earlier rotations (and earlier runs)."""
+        keep = {os.path.basename(path) for path in paths}
+        try:
+            names = os.listdir(self.image_dir)
+        except OSError:
+            return
+        for name in names:
+            if name.endswith('.png') and name not in keep:
+                try:
+                    os.remove(os.path.join(self.image_dir, name))
+                except OSError as e:
+                    log.warning('Error removing old shop image %s: %s', name, e)
+
+    async def _render(self, snapshot):
+        os.makedirs(self.image_dir, exist_ok=True)
+        entries = snapshot.entries[:TILES_PER_IMAGE * MAX_IMAGES]
+        pages = [entries[start:start + TILES_PER_IMAGE] for start in range(0, len(entries), TILES_PER_IMAGE)]
+        paths = [os.path.join(self.image_dir, f'{snapshot.fingerprint[:16]}-{index}.png') for index in range(len(pages))]
+        if all(os.path.exists(path) for path in paths):
+            return paths
+
+        icons = await self.image_cache.fetch_many([entry.item.icon_url or entry.item.featured_url for entry in entries])
+
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=pool_context())
+        loop = asyncio.get_running_loop()
+        jobs = []
+        offset = 0
+        for page, path in zip(pages, paths):
+            tiles = [
+                (icons[offset + i], self._rgb(entry.item.rarity), entry.item.name, entry.final_price)
+                for i, entry in enumerate(page)
+            ]
+            offset += len(page)
+            jobs.append(loop.run_in_executor(self._pool, compose_grid, tiles, path))
+        return list(await asyncio.gather(*jobs))
+
+    def _rgb(self, rarity):
+        color = self.color_for(rarity)
+        return ((color >> 16) & 0xFF, (color >> 8) & 0xFF, color & 0xFF)
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
@@ -0,0 +1,372 @@
+import hashlib
+from datetime import datetime, timedelta, timezone
+
+from shop_ranking import PriceRanking
+from shop_search import SearchIndex
+
+
+def parse_api_date(value):
+    """Parse an ISO-8601 date from the Fortnite API into an aware datetime."""
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except (TypeError, ValueError):
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed
+
+
+def next_daily_rotation(now):
+    """Return the next 00:00 UTC, when the shop rotates daily."""
+    return (now + timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def shop_fingerprint(entries):
+    """Digest of the offers and prices in a shop, independent of entry order.
+
+    Only fields that make a shop "new" to players are included, so volatile
+    payload fields never trigger a re-broadcast.
+    """
+    offers = sorted(f'{entry.offer_id}:{entry.final_price}:{entry.regular_price}' for entry in entries)
+    return hashlib.sha256('\n'.join(offers).encode('utf-8')).hexdigest()
+
+
+class ShopDiff:
+    """Offers added, removed and repriced between two snapshots."""
+
+    __slots__ = ('added', 'removed', 'repriced')
+
+    def __init__(self, added, removed, repriced):
+        self.added = added
+        self.removed = removed
+        self.repriced = repriced
+
+    def __bool__(self):
+        return bool(self.added or self.removed or self.repriced)
+
+
+def diff_snapshots(old, new):
+    """Compare two snapshots offer by offer; old may be None."""
+    old_offers = {entry.offer_id: entry for entry in old.entries} if old else {}
+    new_offers = {entry.offer_id: entry for entry in new.entries}
+
+    added = tuple(entry for offer_id, entry in new_offers.items() if offer_id not in old_offers)
+    removed = tuple(entry for offer_id, entry in old_offers.items() if offer_id not in new_offers)
+    repriced = tuple(
+        (old_offers[offer_id], entry) for offer_id, entry in new_offers.items()
+        if offer_id in old_offers and (
+            old_offers[offer_id].final_price != entry.final_price
+            or old_offers[offer_id].regular_price != entry.regular_price
+        )
+    )
+    return ShopDiff(added, removed, repriced)
+
+
+class _Record:
+    """Base for the slotted shop records: equality and repr over their fields."""
+
+    __slots__ = ()
+    _fields = ()
+
+    def __eq__(self, other):
+        if type(other) is not type(self):
+            return NotImplemented
+        return all(getattr(self, name) == getattr(other, name) for name in self._fields)
+
+    __hash__ = None
+
+    def __repr__(self):
+        fields = ', '.join(f'{name}={getattr(self, name)!r}' for name in self._fields)
+        return f'{type(self).__name__}({fields})'
+
+
+class ShopItem(_Record):
+    """A cosmetic from an entry's brItems list."""
+
+    __slots__ = _fields = (
+        'id', 'name', 'description', 'rarity', 'rarity_value',
+        'type', 'type_value', 'set_text', 'icon_url', 'featured_url'
+    )
+
+    def __init__(self, id, name, description, rarity, rarity_value,
+                 type, type_value, set_text, icon_url, featured_url):
+        self.id = id
+        self.name = name
+        self.description = description
+        self.rarity = rarity
+        self.rarity_value = rarity_value
+        self.type = type
+        self.type_value = type_value
+        self.set_text = set_text
+        self.icon_url = icon_url
+        self.featured_url = featured_url
+
+    @classmethod
+    def from_api(cls, item):
+        rarity = item.get('rarity') or {}
+        item_type = item.get('type') or {}
+        images = item.get('images') or {}
+        return cls(
+            id=item.get('id', ''),
+            name=item.get('name') or 'Unknown Item',
+            description=item.get('description') or 'No description available.',
+            rarity=rarity.get('displayValue') or 'Common',
+            rarity_value=(rarity.get('value') or '').lower(),
+            type=item_type.get('displayValue') or 'Item',
+            type_value=(item_type.get('value') or '').lower(),
+            set_text=(item.get('set') or {}).get('text') or '',
+            icon_url=images.get('icon') or '',
+            featured_url=images.get('featured') or ''
+        )
+
+    def to_record(self):
+        return [getattr(self, name) for name in self._fields]
+
+    @classmethod
+    def from_record(cls, record):
+        return cls(*record)
+
+
+class ShopEntry(_Record):
+    """A purchasable shop offer and the first cosmetic it grants."""
+
+    __slots__ = _fields = (
+        'offer_id', 'final_price', 'regular_price', 'bundle_name',
+        'out_date', 'item', 'item_ids'
+    )
+
+    def __init__(self, offer_id, final_price, regular_price, bundle_name,
+                 out_date, item, item_ids):
+        self.offer_id = offer_id
+        self.final_price = final_price
+        self.regular_price = regular_price
+        self.bundle_name = bundle_name
+        self.out_date = out_date
+        self.item = item
+        self.item_ids = item_ids
+
+    @classmethod
+    def from_api(cls, entry):
+        """Build an entry from the raw API dict, or None if it has no brItems."""
+        br_items = entry.get('brItems')
+        if not br_items:
+            return None
+
+        final_price = entry.get('finalPrice', 0)
+        bundle = entry.get('bundle')
+        return cls(
+            offer_id=entry.get('offerId', ''),
+            final_price=final_price,
+            regular_price=entry.get('regularPrice', final_price),
+            bundle_name=(bundle.get('name') or 'Unknown Bundle') if bundle else None,
+            out_date=parse_api_date(entry.get('outDate')),
+            item=ShopItem.from_api(br_items[0]),
+            item_ids=tuple(br.get('id', '') for br in br_items)
+        )
+
+    def to_record(self):
+        return [
+            self.offer_id, self.final_price, self.regular_price, self.bundle_name,
+            self.out_date.isoformat() if self.out_date else None,
+            self.item.to_record(), list(self.item_ids)
+        ]
+
+    @classmethod
+    def from_record(cls, record):
+        offer_id, final_price, regular_price, bundle_name, out_date, item, item_ids = record
+        return cls(
+            offer_id, final_price, regular_price, bundle_name, parse_api_date(out_date),
+            ShopItem.from_record(item), tuple(item_ids)
+        )
+
+    @property
+    def name(self):
+        return self.item.name
+
+    @property
+    def on_sale(self):
+        return self.final_price < self.regular_price
+
+    @property
+    def discount(self):
+        return self.regular_price - self.final_price
+
+
+class ShopSnapshot(_Record):
+    """The normalized shop, parsed once per upstream payload.
+
+    Lookup indexes are built alongside the entries so the commands never
+    have to scan the whole shop.
+    """
+
+    _fields = ('entries', 'total_entries', 'total_value', 'date')
+    __slots__ = _fields + (
+        'by_name', 'by_rarity', 'by_type', 'bundles', 'fingerprint',
+        '_search_index', '_ranking', '_content_hash'
+    )
+
+    def __init__(self, entries, total_entries, total_value, date):
+        self.entries = entries
+        self.total_entries = total_entries
+        self.total_value = total_value
+        self.date = date
+        self._search_index = None
+        self._ranking = None
+        self._content_hash = None
+        self._build_indexes()
+        self.fingerprint = shop_fingerprint(entries)
+
+    def _build_indexes(self):
+        by_name = {}
+        by_rarity = {}
+        by_type = {}
+        bundles = []
+        for entry in self.entries:
+            item = entry.item
+            # Keep the first entry for a name, matching the old linear scan
+            by_name.setdefault(item.name.casefold(), entry)
+            by_rarity.setdefault(item.rarity_value, []).append(entry)
+            by_type.setdefault(item.type_value, []).append(entry)
+            if entry.bundle_name:
+                bundles.append(entry)
+
+        self.by_name = by_name
+        self.by_rarity = {key: tuple(value) for key, value in by_rarity.items()}
+        self.by_type = {key: tuple(value) for key, value in by_type.items()}
+        self.bundles = tuple(bundles)
+
+    def to_record(self):
+        """Return a JSON-serializable form of the snapshot."""
+        return {
+            'date': self.date,
+            'total_entries': self.total_entries,
+            'total_value': self.total_value,
+            'entries': [entry.to_record() for entry in self.entries]
+        }
+
+    @classmethod
+    def from_record(cls, record):
+        return cls(
+            entries=tuple(ShopEntry.from_record(entry) for entry in record['entries']),
+            total_entries=record['total_entries'],
+            total_value=record['total_value'],
+            date=record['date']
+        )
+
+    def to_shared_record(self):
+        """Return to_record() plus every index, for processes that load it without rebuilding.
+
+        Entries in the indexes are referred to by position in 'entries'.
+        """
+        position = {id(entry): i for i, entry in enumerate(self.entries)}
+
+        def positions(entries):
+            return [position[id(entry)] for entry in entries]
+
+        record = self.to_record()
+        record['indexes'] = {
+            'fingerprint': self.fingerprint,
+            'content_hash': self.content_hash,
+            'by_name': {name: position[id(entry)] for name, entry in self.by_name.items()},
+            'by_rarity': {key: positions(entries) for key, entries in self.by_rarity.items()},
+            'by_type': {key: positions(entries) for key, entries in self.by_type.items()},
+            'bundles': positions(self.bundles),
+            'search': self.search_index.to_record(),
+            'ranking': self.ranking.to_record(position),
+        }
+        return record
+
+    @classmethod
+    def from_shared_record(cls, record):
+        """Load a to_shared_record() result, reusing its indexes instead of building them."""
+        indexes = record.get('indexes')
+        if indexes is None:
+            return cls.from_record(record)
+        entries = tuple(ShopEntry.from_record(entry) for entry in record['entries'])
+
+        def restore(by_key):
+            return {key: tuple(entries[i] for i in value) for key, value in by_key.items()}
+
+        snapshot = cls.__new__(cls)
+        snapshot.entries = entries
+        snapshot.total_entries = record['total_entries']
+        snapshot.total_value = record['total_value']
+        snapshot.date = record['date']
+        snapshot.by_name = {name: entries[i] for name, i in indexes['by_name'].items()}
+        snapshot.by_rarity = restore(indexes['by_rarity'])
+        snapshot.by_type = restore(indexes['by_type'])
+        snapshot.bundles = tuple(entries[i] for i in indexes['bundles'])
+        snapshot.fingerprint = indexes['fingerprint']
+        snapshot._content_hash = indexes['content_hash']
+        snapshot._search_index = SearchIndex.from_record(entries, indexes['search'])
+        snapshot._ranking = PriceRanking.from_record(entries, indexes['ranking'])
+        return snapshot
+
+    @property
+    def content_hash(self):
+        """Digest of everything the bot renders from this snapshot."""
+        if self._content_hash is None:
+            self._content_hash = hashlib.sha1(repr(self).encode('utf-8')).hexdigest()
+        return self._content_hash
+
+    @property
+    def search_index(self):
+        """Full-text index for /search and autocomplete, built on first use."""
+        if self._search_index is None:
+            self._search_index = SearchIndex(self.entries)
+        return self._search_index
+
+    @property
+    def ranking(self):
+        """Price and discount orderings, built on first use."""
+        if self._ranking is None:
+            self._ranking = PriceRanking(self.entries)
+        return self._ranking
+
+    def find(self, name):
+        """Return the entry whose item name matches, ignoring case."""
+        return self.by_name.get(name.strip().casefold())
+
+    def with_rarity(self, rarity_value):
+        return self.by_rarity.get(rarity_value.casefold(), ())
+
+    def with_type(self, type_value):
+        return self.by_type.get(type_value.casefold(), ())
+
+    @classmethod
+    def from_payload(cls, shop_data):
+        """Parse a /v2/shop response, or return None if it carries no shop."""
+        data = (shop_data or {}).get('data')
+        if not data:
+            return None
+
+        raw_entries = data.get('entries') or []
+        entries = []
+        for raw_entry in raw_entries:
+            entry = ShopEntry.from_api(raw_entry)
+            if entry is not None:
+                entries.append(entry)
+
+        return cls(
+            entries=tuple(entries),
+            total_entries=len(raw_entries),
+            total_value=sum(raw_entry.get('finalPrice', 0) for raw_entry in raw_entries),
+            date=data.get('date', '')
+        )
+
+    def __iter__(self):
+        return iter(self.entries)
+
+    def next_rotation(self, now=None):
+        """Return the time the earliest entry leaves the shop."""
+        now = now or datetime.now(timezone.utc)
+        upcoming = None
+        for entry in self.entries:
+            out_date = entry.out_date
+            if out_date and out_date > now and (upcoming is None or out_date < upcoming):
+                upcoming = out_date
+        if upcoming is None:
+            upcoming = next_daily_rotation(now)
+        return upcoming
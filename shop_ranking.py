@@ -0,0 +1,71 @@
+import heapq
+
+
+def discount_percent(entry):
+    """Return the whole-number discount percentage of an entry."""
+    if not entry.regular_price:
+        return 0
+    return int((entry.discount / entry.regular_price) * 100)
+
+
+class PriceRanking:
+    """Price and discount orderings for one shop snapshot.
+
+    The full orderings are sorted once; filtered queries use a heap over
+    the candidates so only the top k are ever ordered.
+    """
+
+    def __init__(self, entries):
+        self.entries = entries
+        self.by_price = tuple(sorted(entries, key=lambda entry: entry.final_price))
+        self.by_price_desc = tuple(sorted(entries, key=lambda entry: entry.final_price, reverse=True))
+
+        deals = [(discount_percent(entry), entry) for entry in entries if entry.on_sale]
+        deals.sort(key=lambda deal: deal[0], reverse=True)
+        self.deals = tuple(deals)
+
+    def to_record(self, position):
+        """Return the orderings as entry positions; position maps id(entry) to its index."""
+        return {
+            'by_price': [position[id(entry)] for entry in self.by_price],
+            'by_price_desc': [position[id(entry)] for entry in self.by_price_desc],
+            'deals': [(percent, position[id(entry)]) for percent, entry in self.deals],
+        }
+
+    @classmethod
+    def from_record(cls, entries, record):
+        """Restore orderings built by another process over the same entries."""
+        ranking = cls.__new__(cls)
+        ranking.entries = entries
+        ranking.by_price = tuple(entries[i] for i in record['by_price'])
+        ranking.by_price_desc = tuple(entries[i] for i in record['by_price_desc'])
+        ranking.deals = tuple((percent, entries[i]) for percent, i in record['deals'])
+        return ranking
+
+    @staticmethod
+    def _top(ordered, limit, candidates, predicate, key, largest):
+        if candidates is None and predicate is None:
+            return list(ordered[:limit])
+
+        pool = ordered if candidates is None else candidates
+        if predicate is not None:
+            pool = (value for value in pool if predicate(value))
+        if largest:
+            return heapq.nlargest(limit, pool, key=key)
+        return heapq.nsmallest(limit, pool, key=key)
+
+    def cheapest(self, limit=10, candidates=None, predicate=None):
+        """Return the lowest priced entries, optionally from a filtered pool."""
+        return self._top(self.by_price, limit, candidates, predicate,
+                         key=lambda entry: entry.final_price, largest=False)
+
+    def most_expensive(self, limit=10, candidates=None, predicate=None):
+        """Return the highest priced entries, optionally from a filtered pool."""
+        return self._top(self.by_price_desc, limit, candidates, predicate,
+                         key=lambda entry: entry.final_price, largest=True)
+
+    def top_deals(self, limit=8, predicate=None):
+        """Return (percent, entry) pairs for the biggest discounts."""
+        deal_predicate = None if predicate is None else (lambda deal: predicate(deal[1]))
+        return self._top(self.deals, limit, None, deal_predicate,
+                         key=lambda deal: deal[0], largest=True)
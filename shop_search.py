@@ -0,0 +1,207 @@
+import re
+from bisect import bisect_left
+
+_TOKEN_RE = re.compile(r'\w+')
+
+# How much a match in each field counts towards an entry's score
+FIELD_WEIGHTS = {
+    'name': 4.0,
+    'bundle': 2.0,
+    'set': 2.0,
+    'description': 1.0,
+}
+
+# How much each kind of token match is worth
+EXACT_MATCH = 1.0
+PREFIX_MATCH = 0.8
+INFIX_MATCH = 0.5
+FUZZY_MATCH = 0.6
+
+
+def tokenize(text):
+    """Split text into casefolded word tokens."""
+    return _TOKEN_RE.findall(text.casefold()) if text else []
+
+
+def trigrams(token):
+    padded = f' {token} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def max_edits(token):
+    """Return how many typos a query token of this length may contain."""
+    if len(token) <= 3:
+        return 0
+    if len(token) <= 6:
+        return 1
+    return 2
+
+
+def bounded_edit_distance(a, b, limit):
+    """Return the Levenshtein distance between a and b, or None if above limit."""
+    if abs(len(a) - len(b)) > limit:
+        return None
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        row_min = i
+        for j, char_b in enumerate(b, 1):
+            cost = 0 if char_a == char_b else 1
+            value = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            current.append(value)
+            if value < row_min:
+                row_min = value
+        if row_min > limit:
+            return None
+        previous = current
+    return previous[-1] if previous[-1] <= limit else None
+
+
+class SearchIndex:
+    """Token and trigram index over one shop snapshot's entries."""
+
+    def __init__(self, entries):
+        self.entries = entries
+        self.postings = {}
+        self.trigram_index = {}
+
+        for doc_id, entry in enumerate(entries):
+            item = entry.item
+            fields = (
+                ('name', item.name),
+                ('bundle', entry.bundle_name),
+                ('set', item.set_text),
+                ('description', item.description),
+            )
+            for field, text in fields:
+                weight = FIELD_WEIGHTS[field]
+                for token in set(tokenize(text)):
+                    postings = self.postings.setdefault(token, {})
+                    postings[doc_id] = postings.get(doc_id, 0.0) + weight
+
+        for token in self.postings:
+            for gram in trigrams(token):
+                self.trigram_index.setdefault(gram, set()).add(token)
+
+        self.vocabulary = sorted(self.postings)
+        self.names = sorted((entry.item.name.casefold(), entry.item.name) for entry in entries)
+
+    def to_record(self):
+        """Return the built index; entries are referred to by position."""
+        return {
+            'postings': self.postings,
+            'trigrams': self.trigram_index,
+            'vocabulary': self.vocabulary,
+            'names': self.names,
+        }
+
+    @classmethod
+    def from_record(cls, entries, record):
+        """Restore an index built by another process over the same entries."""
+        index = cls.__new__(cls)
+        index.entries = entries
+        index.postings = record['postings']
+        index.trigram_index = record['trigrams']
+        index.vocabulary = record['vocabulary']
+        index.names = record['names']
+        return index
+
+    def _prefix_tokens(self, prefix):
+        start = bisect_left(self.vocabulary, prefix)
+        for token in self.vocabulary[start:]:
+            if not token.startswith(prefix):
+                break
+            yield token
+
+    def _infix_tokens(self, token):
+        inner = [token[i:i + 3] for i in range(len(token) - 2)]
+        if not inner:
+            return
+        candidates = set(self.trigram_index.get(inner[0], ()))
+        for gram in inner[1:]:
+            candidates &= self.trigram_index.get(gram, set())
+        for candidate in candidates:
+            if token in candidate:
+                yield candidate
+
+    def _fuzzy_tokens(self, token):
+        limit = max_edits(token)
+        if not limit:
+            return
+        candidates = set()
+        for gram in trigrams(token):
+            candidates.update(self.trigram_index.get(gram, ()))
+        for candidate in candidates:
+            distance = bounded_edit_distance(token, candidate, limit)
+            if distance:
+                yield candidate, distance
+
+    def _match_token(self, token):
+        """Return {vocabulary token: match quality} for one query token."""
+        matches = {}
+        for candidate in self._prefix_tokens(token):
+            matches[candidate] = EXACT_MATCH if candidate == token else PREFIX_MATCH
+        for candidate in self._infix_tokens(token):
+            matches.setdefault(candidate, INFIX_MATCH)
+        for candidate, distance in self._fuzzy_tokens(token):
+            quality = FUZZY_MATCH / distance
+            if quality > matches.get(candidate, 0.0):
+                matches[candidate] = quality
+        return matches
+
+    def search(self, query, limit=5):
+        """Return up to limit entries ranked by how well they match query."""
+        query_tokens = tokenize(query)
+        if not query_tokens:
+            return []
+
+        scores = {}
+        matched = {}
+        for token in query_tokens:
+            for candidate, quality in self._match_token(token).items():
+                for doc_id, weight in self.postings[candidate].items():
+                    best = matched.setdefault(doc_id, {})
+                    score = quality * weight
+                    if score > best.get(token, 0.0):
+                        best[token] = score
+
+        for doc_id, token_scores in matched.items():
+            score = sum(token_scores.values())
+            # Entries that match every query word rank above partial matches
+            if len(token_scores) == len(set(query_tokens)):
+                score *= 2
+            scores[doc_id] = score
+
+        query_text = query.strip().casefold()
+        for doc_id in scores:
+            name = self.entries[doc_id].item.name.casefold()
+            if name == query_text:
+                scores[doc_id] += 10.0
+            elif name.startswith(query_text):
+                scores[doc_id] += 5.0
+
+        ranked = sorted(scores, key=lambda doc_id: (-scores[doc_id], doc_id))
+        return [self.entries[doc_id] for doc_id in ranked[:limit]]
+
+    def complete(self, prefix, limit=25):
+        """Return item names for an autocomplete prefix, best matches first."""
+        prefix = prefix.strip().casefold()
+        results = []
+        seen = set()
+
+        def add(name):
+            if name not in seen:
+                seen.add(name)
+                results.append(name)
+
+        start = bisect_left(self.names, (prefix,))
+        for folded, name in self.names[start:]:
+            if len(results) >= limit or not folded.startswith(prefix):
+                break
+            add(name)
+
+        if prefix and len(results) < limit:
+            for entry in self.search(prefix, limit=limit):
+                add(entry.item.name)
+
+        return results[:limit]
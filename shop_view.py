@@ -0,0 +1,101 @@
+import discord
+
+# Seconds a paginator stays interactive after its last use
+VIEW_TIMEOUT = 180
+
+ALL_OPTION = 'all'
+
+
+class JumpModal(discord.ui.Modal, title='Jump to page'):
+    page = discord.ui.TextInput(label='Page number', max_length=4)
+
+    def __init__(self, view):
+        super().__init__()
+        self.view = view
+
+    async def on_submit(self, interaction: discord.Interaction):
+        try:
+            page = int(self.page.value) - 1
+        except ValueError:
+            await interaction.response.send_message('Please enter a page number.', ephemeral=True)
+            return
+        await self.view.show(interaction, page)
+
+
+class FilterSelect(discord.ui.Select):
+    def __init__(self, kind, placeholder, values, row):
+        options = [discord.SelectOption(label='All', value=ALL_OPTION)]
+        options.extend(discord.SelectOption(label=label, value=value) for value, label in values[:24])
+        super().__init__(placeholder=placeholder, options=options, row=row)
+        self.kind = kind
+
+    async def callback(self, interaction: discord.Interaction):
+        value = self.values[0]
+        setattr(self.view, self.kind, None if value == ALL_OPTION else value)
+        await self.view.show(interaction, 0)
+
+
+class ShopPaginator(discord.ui.View):
+    """Interactive, page-at-a-time view of the shop.
+
+    render_page(rarity, item_type, page) returns (embed, page, page_count),
+    clamping page to the pages that exist, and is only called for pages
+    someone actually opens. The view drops its state when it times out.
+    """
+
+    def __init__(self, render_page, rarities, types, owner_id, timeout=VIEW_TIMEOUT):
+        super().__init__(timeout=timeout)
+        self.render_page = render_page
+        self.owner_id = owner_id
+        self.rarity = None
+        self.item_type = None
+        self.page = 0
+        self.page_count = 1
+        self.message = None
+
+        if rarities:
+            self.add_item(FilterSelect('rarity', 'Filter by rarity', rarities, row=1))
+        if types:
+            self.add_item(FilterSelect('item_type', 'Filter by type', types, row=2))
+
+    def render(self, page):
+        """Render a page for the current filters and update the buttons."""
+        embed, self.page, self.page_count = self.render_page(self.rarity, self.item_type, page)
+        self.previous_page.disabled = self.page == 0
+        self.next_page.disabled = self.page >= self.page_count - 1
+        self.jump.disabled = self.page_count <= 1
+        return embed
+
+    async def show(self, interaction, page):
+        embed = self.render(page)
+        await interaction.response.edit_message(embed=embed, view=self)
+
+    async def interaction_check(self, interaction: discord.Interaction):
+        if interaction.user.id != self.owner_id:
+            await interaction.response.send_message('Run /shop to browse the shop yourself.', ephemeral=True)
+            return False
+        return True
+
+    @discord.ui.button(label='◀ Prev', style=discord.ButtonStyle.secondary, row=0)
+    async def previous_page(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await self.show(interaction, self.page - 1)
+
+    @discord.ui.button(label='Jump', style=discord.ButtonStyle.primary, row=0)
+    async def jump(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await interaction.response.send_modal(JumpModal(self))
+
+    @discord.ui.button(label='Next ▶', style=discord.ButtonStyle.secondary, row=0)
+    async def next_page(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await self.show(interaction, self.page + 1)
+
+    async def on_timeout(self):
+        # Release the snapshot reference and grey out the controls
+        self.render_page = None
+        for child in self.children:
+            child.disabled = True
+        if self.message is not None:
+            try:
+                await self.message.edit(view=self)
+            except discord.HTTPException:
+                pass
+        self.message = None
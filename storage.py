@@ -0,0 +1,201 @@
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+
+from shop_model import ShopSnapshot
+
+log = logging.getLogger(__name__)
+
+# SQLite database for guild settings and the last seen shop
+SHOP_DB_PATH = os.getenv('SHOP_DB_PATH', 'shopbot.db')
+# How long writes are collected before they are committed together
+STORE_FLUSH_DELAY = float(os.getenv('STORE_FLUSH_DELAY', '1'))
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS guild_settings (
+    guild_id INTEGER PRIMARY KEY,
+    channel_id INTEGER,
+    settings TEXT NOT NULL DEFAULT '{}'
+);
+CREATE TABLE IF NOT EXISTS bot_state (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE TABLE IF NOT EXISTS watches (
+    user_id INTEGER NOT NULL,
+    item_id TEXT NOT NULL,
+    item_name TEXT NOT NULL,
+    PRIMARY KEY (user_id, item_id)
+);
+'''
+
+
+class ShopStore:
+    """SQLite (WAL mode) store for guild configuration and the last shop.
+
+    All database work runs on one background thread. Writes are queued and
+    committed together in a single transaction shortly after the first one
+    arrives, so commands never wait on disk.
+    """
+
+    def __init__(self, path=SHOP_DB_PATH, flush_delay=STORE_FLUSH_DELAY, scope=''):
+        self.path = path
+        self.flush_delay = flush_delay
+        # Processes serving different shards each remember what they announced
+        self.announced_key = f'announced_fingerprint:{scope}' if scope else 'announced_fingerprint'
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='shop-store')
+        self._conn = None
+        self._pending = []
+        self._flush_task = None
+        self._saved_fingerprint = None
+
+    async def _run(self, func, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, func, *args)
+
+    def _open(self):
+        conn = sqlite3.connect(self.path, check_same_thread=False)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.executescript(SCHEMA)
+        conn.commit()
+        return conn
+
+    async def open(self):
+        if self._conn is None:
+            self._conn = await self._run(self._open)
+
+    # Reads (used at startup)
+
+    def _load(self):
+        channels = self._conn.execute(
+            'SELECT guild_id, channel_id FROM guild_settings WHERE channel_id IS NOT NULL'
+        ).fetchall()
+        state = dict(self._conn.execute('SELECT key, value FROM bot_state').fetchall())
+        return channels, state
+
+    async def load(self):
+        """Return (guild channels, last announced fingerprint, last snapshot) from disk."""
+        await self.open()
+        channels, state = await self._run(self._load)
+
+        snapshot = None
+        if state.get('snapshot'):
+            try:
+                snapshot = ShopSnapshot.from_record(json.loads(state['snapshot']))
+                self._saved_fingerprint = snapshot.fingerprint
+            except (ValueError, KeyError, TypeError) as e:
+                log.warning('Ignoring unreadable stored snapshot: %s', e)
+        return channels, state.get(self.announced_key), snapshot
+
+    async def load_watches(self):
+        """Return every (user_id, item_id, item_name) watch subscription."""
+        await self.open()
+        return await self._run(lambda: self._conn.execute(
+            'SELECT user_id, item_id, item_name FROM watches'
+        ).fetchall())
+
+    async def get_settings(self, guild_id):
+        await self.open()
+        row = await self._run(lambda: self._conn.execute(
+            'SELECT settings FROM guild_settings WHERE guild_id = ?', (guild_id,)
+        ).fetchone())
+        return json.loads(row[0]) if row else {}
+
+    # Batched writes
+
+    def _queue(self, sql, params):
+        self._pending.append((sql, params))
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.ensure_future(self._delayed_flush())
+
+    async def _delayed_flush(self):
+        await asyncio.sleep(self.flush_delay)
+        await self.flush()
+
+    def _write(self, statements):
+        with self._conn:
+            for sql, params in statements:
+                self._conn.execute(sql, params)
+
+    async def flush(self):
+        """Commit every queued write in one transaction."""
+        if not self._pending:
+            return
+        await self.open()
+        statements, self._pending = self._pending, []
+        try:
+            await self._run(self._write, statements)
+        except sqlite3.Error as e:
+            log.error('Error writing to shop store: %s', e)
+
+    def save_channel(self, guild_id, channel_id):
+        self._queue(
+            'INSERT INTO guild_settings (guild_id, channel_id) VALUES (?, ?) '
+            'ON CONFLICT(guild_id) DO UPDATE SET channel_id = excluded.channel_id',
+            (guild_id, channel_id)
+        )
+
+    def delete_channel(self, guild_id):
+        self._queue('UPDATE guild_settings SET channel_id = NULL WHERE guild_id = ?', (guild_id,))
+
+    def save_settings(self, guild_id, settings):
+        self._queue(
+            'INSERT INTO guild_settings (guild_id, settings) VALUES (?, ?) '
+            'ON CONFLICT(guild_id) DO UPDATE SET settings = excluded.settings',
+            (guild_id, json.dumps(settings))
+        )
+
+    async def watches_version(self):
+        """Return a counter bumped by every watch change, from any process."""
+        await self.open()
+        row = await self._run(lambda: self._conn.execute(
+            "SELECT value FROM bot_state WHERE key = 'watches_version'"
+        ).fetchone())
+        return int(row[0]) if row else 0
+
+    def _bump_watches_version(self):
+        self._queue(
+            "INSERT INTO bot_state (key, value) VALUES ('watches_version', 1) "
+            'ON CONFLICT(key) DO UPDATE SET value = value + 1',
+            ()
+        )
+
+    def save_watch(self, user_id, item_id, item_name):
+        self._queue(
+            'INSERT OR REPLACE INTO watches (user_id, item_id, item_name) VALUES (?, ?, ?)',
+            (user_id, item_id, item_name)
+        )
+        self._bump_watches_version()
+
+    def delete_watch(self, user_id, item_id):
+        self._queue('DELETE FROM watches WHERE user_id = ? AND item_id = ?', (user_id, item_id))
+        self._bump_watches_version()
+
+    def save_snapshot(self, snapshot):
+        """Keep the latest shop so a restart can serve it before the first fetch."""
+        if snapshot.fingerprint == self._saved_fingerprint:
+            return
+        self._saved_fingerprint = snapshot.fingerprint
+        record = json.dumps(snapshot.to_record(), separators=(',', ':'))
+        self._queue('INSERT OR REPLACE INTO bot_state (key, value) VALUES (?, ?)', ('snapshot', record))
+
+    def save_announced(self, fingerprint):
+        """Remember the last broadcast shop so a restart does not repeat it."""
+        self._queue(
+            'INSERT OR REPLACE INTO bot_state (key, value) VALUES (?, ?)',
+            (self.announced_key, fingerprint)
+        )
+
+    async def close(self):
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            self._flush_task = None
+        await self.flush()
+        if self._conn is not None:
+            await self._run(self._conn.close)
+            self._conn = None
+        self._executor.shutdown(wait=True)
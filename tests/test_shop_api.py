@@ -0,0 +1,60 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip('aiohttp')
+
+import shop_api  # noqa: E402
+from bench.fake_api import FakeShopAPI  # noqa: E402
+from bench.fixtures import make_payload  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def fresh_state(monkeypatch):
+    monkeypatch.setattr(shop_api, 'breakers', {})
+    monkeypatch.setattr(shop_api, '_validators', {})
+    monkeypatch.setattr(shop_api, 'FORTNITE_API_MIRRORS', [])
+    monkeypatch.setattr(shop_api, 'RETRY_BASE_DELAY', 0.0)
+
+
+def run(coroutine):
+    async def main():
+        try:
+            return await coroutine
+        finally:
+            await shop_api.close_session()
+    return asyncio.run(main())
+
+
+def test_error_body_with_200_is_a_failure():
+    async def scenario():
+        api = FakeShopAPI(make_payload(50), error_rate=1.0, error_mode='empty')
+        url = await api.start()
+        try:
+            return url, await shop_api.request_shop(url)
+        finally:
+            await api.stop()
+
+    url, result = run(scenario())
+    assert result is None
+    assert url not in shop_api._validators
+    assert shop_api.get_breaker(url).failures == 1
+
+
+def test_error_body_fails_over_to_mirror(monkeypatch):
+    payload = make_payload(50)
+
+    async def scenario():
+        broken = FakeShopAPI(payload, error_rate=1.0, error_mode='empty')
+        mirror = FakeShopAPI(payload)
+        monkeypatch.setattr(shop_api, 'FORTNITE_API_URL', await broken.start())
+        monkeypatch.setattr(shop_api, 'FORTNITE_API_MIRRORS', [await mirror.start()])
+        try:
+            return await shop_api.fetch_shop(), mirror.requests
+        finally:
+            await broken.stop()
+            await mirror.stop()
+
+    result, mirror_requests = run(scenario())
+    assert result == payload
+    assert mirror_requests == 1
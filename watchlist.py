@@ -0,0 +1,159 @@
+import asyncio
+import logging
+import os
+
+import discord
+
+from ratelimit import AsyncRateLimiter
+
+log = logging.getLogger(__name__)
+
+# Most items one user can watch
+WATCH_LIMIT = int(os.getenv('WATCH_LIMIT', '25'))
+# Alert DMs sent per second, kept well under Discord's global limit
+ALERT_RATE = float(os.getenv('ALERT_RATE', '5'))
+
+
+def shop_item_ids(snapshot):
+    """Map every cosmetic ID in a shop (bundle contents included) to its entry."""
+    entries = {}
+    for entry in snapshot.entries:
+        for item_id in entry.item_ids:
+            entries.setdefault(item_id, entry)
+    return entries
+
+
+class WatchList:
+    """Item alert subscriptions with an inverted index from item ID to users.
+
+    Matching a new shop only looks at the shop's item IDs that anyone
+    watches, so it costs one set intersection plus the number of matches,
+    however many subscriptions exist.
+    """
+
+    def __init__(self, store=None, limit=WATCH_LIMIT):
+        self.store = store
+        self.limit = limit
+        self._watchers = {}
+        self._by_user = {}
+        self._seen_ids = None
+        # The store's watches version this list was loaded at
+        self.version = 0
+
+    def load(self, watches):
+        """Fill the list from (user_id, item_id, item_name) rows without writing back."""
+        for user_id, item_id, item_name in watches:
+            self._watchers.setdefault(item_id, set()).add(user_id)
+            self._by_user.setdefault(user_id, {})[item_id] = item_name
+
+    def reload(self, watches):
+        """Replace every subscription with (user_id, item_id, item_name) rows, e.g. ones another process wrote."""
+        self._watchers = {}
+        self._by_user = {}
+        self.load(watches)
+
+    def __len__(self):
+        return sum(len(users) for users in self._watchers.values())
+
+    def watched(self, user_id):
+        """Return {item_id: item_name} for a user."""
+        return self._by_user.get(user_id, {})
+
+    def add(self, user_id, item_id, item_name):
+        """Watch an item; returns False if the user is at the watch limit."""
+        items = self._by_user.setdefault(user_id, {})
+        if item_id not in items and len(items) >= self.limit:
+            return False
+        items[item_id] = item_name
+        self._watchers.setdefault(item_id, set()).add(user_id)
+        if self.store is not None:
+            self.store.save_watch(user_id, item_id, item_name)
+        return True
+
+    def remove(self, user_id, item_id):
+        items = self._by_user.get(user_id)
+        if not items or item_id not in items:
+            return None
+        item_name = items.pop(item_id)
+        if not items:
+            del self._by_user[user_id]
+        watchers = self._watchers[item_id]
+        watchers.discard(user_id)
+        if not watchers:
+            del self._watchers[item_id]
+        if self.store is not None:
+            self.store.delete_watch(user_id, item_id)
+        return item_name
+
+    def seen(self, snapshot):
+        """Record a shop whose items should not trigger alerts (e.g. the one at startup)."""
+        self._seen_ids = set(shop_item_ids(snapshot))
+
+    def match(self, snapshot):
+        """Return {user_id: [entries]} for watched items that just entered the shop.
+
+        Items that were already in the previously matched shop are skipped so
+        a mid-day shop change does not alert users twice.
+        """
+        entries = shop_item_ids(snapshot)
+        new_ids = entries.keys() - self._seen_ids if self._seen_ids is not None else entries.keys()
+        self._seen_ids = set(entries)
+
+        alerts = {}
+        for item_id in new_ids & self._watchers.keys():
+            entry = entries[item_id]
+            for user_id in self._watchers[item_id]:
+                matched = alerts.setdefault(user_id, [])
+                if entry not in matched:
+                    matched.append(entry)
+        return alerts
+
+
+class AlertQueue:
+    """Sends watch alert DMs from a background task at a fixed rate.
+
+    Queuing never blocks, so alerts cannot hold up the rotation broadcast.
+    """
+
+    def __init__(self, client, rate=ALERT_RATE):
+        self.client = client
+        self.limiter = AsyncRateLimiter(rate)
+        self.sent = 0
+        self.failed = 0
+        self._queue = asyncio.Queue()
+        self._task = None
+
+    def __len__(self):
+        return self._queue.qsize()
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.ensure_future(self._run())
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def put(self, user_id, message):
+        """Queue a DM (channel.send kwargs) for a user."""
+        self._queue.put_nowait((user_id, message))
+
+    async def _send(self, user_id, message):
+        try:
+            user = self.client.get_user(user_id) or await self.client.fetch_user(user_id)
+            await user.send(**message)
+            self.sent += 1
+        except discord.HTTPException as e:
+            # Usually the user has DMs from server members turned off
+            log.info('Could not send watch alert to user %s: %s', user_id, e, extra={'user_id': user_id})
+            self.failed += 1
+
+    async def _run(self):
+        while True:
+            user_id, message = await self._queue.get()
+            try:
+                await self.limiter.acquire()
+                await self._send(user_id, message)
+            finally:
+                self._queue.task_done()